@@ -1,42 +1,206 @@
 import streamlit as st
+import altair as alt
+import numpy as np
 import pandas as pd
 import requests
-import joblib # To load your trained model
-from datetime import datetime, timedelta 
+import time
+import uuid
+
+from rootpredict import metrics, settings
+from rootpredict.batch import REQUIRED_COLUMNS as BATCH_REQUIRED_COLUMNS, BatchInputError, read_plots, results_to_bytes, template_csv as batch_template_csv
+from rootpredict.climate import DEFAULT_END as CLIMATE_END_DATE, DEFAULT_START as CLIMATE_START_DATE
+from rootpredict.engine import SCENARIO_OPTIONS, ScenarioInputs, apply_scenario, get_engine
+from rootpredict.growing_season import growing_season, growing_seasons
+from rootpredict.optimizer import recommend_inputs
+from rootpredict.prefetch import get_prefetcher
+from rootpredict.registry import get_registry
+from rootpredict.sweep import run_sweep
+from rootpredict.weather import WeatherServiceError
 
 # --- Configuration ---
 # IMPORTANT: Your actual OpenWeather API KEY
 OPENWEATHER_API_KEY = st.secrets["OPENWEATHER_API_KEY"] 
 
-# Load the trained model and feature columns
-try:
-    model = joblib.load('crop_yield_model.pkl')
-    model_features = joblib.load('model_features.pkl')
-except FileNotFoundError:
-    st.error("❌ Model files (crop_yield_model.pkl or model_features.pkl) not found. Please ensure they are in the same directory as this app.py.")
+# Geocoding, current weather and climate normals for the entered city, fetched in the background on a
+# process-wide pool; identical in-flight requests from different sessions share one fetch. City lookups
+# are cached in memory and on disk, Meteostat climate normals on disk per ~11 km grid cell.
+prefetcher = get_prefetcher(OPENWEATHER_API_KEY)
+
+# Supported crops and their models come from crops.json. Each model is loaded lazily (on the first
+# prediction for one of its crops) and cached per server process, so reruns and other sessions reuse it.
+crop_registry = get_registry()
+available_crops = crop_registry.available_crops()
+if not available_crops:
+    st.error("❌ Model files listed in crops.json (e.g. crop_yield_model.rpf, or crop_yield_model.pkl and model_features.pkl) not found. Please ensure they are in the same directory as this app.py.")
     st.stop() # Stop the app if model files are missing
-
-# Hardcoded Historical Average Yields (calculated from your crop_data.csv)
-HISTORICAL_AVG_YIELDS = {
-    'maize': 363.10, # Average yield for maize in your dataset (tonnes/hectare)
-    'rice': 407.30 # Average yield for rice in your dataset (tonnes/hectare)
-}
-
-# Hardcoded Average Nutrient and Pesticide Requirements per Hectare (calculated from your crop_data.csv)
-AVG_NUTRIENT_PESTICIDE_PER_HA = {
-    'maize': {'N': 77.76, 'P': 48.44, 'K': 19.79, 'pesticides_tonnes_per_ha_base': 327.66}, 
-    'rice': {'N': 79.89, 'P': 47.58, 'K': 39.87, 'pesticides_tonnes_per_ha_base': 369.42}  
-}
+# All prediction logic lives in the headless engine; this script only renders it
+engine = get_engine()
+# Live prediction waits this long after a slider change; a newer change within the pause replaces it
+LIVE_PREDICTION_DEBOUNCE_SECONDS = 0.3
+# Prometheus scrape endpoint for this server process (only when ROOTPREDICT_METRICS_PORT is set)
+if settings.METRICS_PORT is not None:
+    metrics.serve(settings.METRICS_PORT)
 
 # Initialize session state for dynamic slider defaults
 if 'avg_temp_from_api' not in st.session_state:
     st.session_state['avg_temp_from_api'] = 25.0 # Default fallback
 if 'avg_annual_rainfall_from_api' not in st.session_state:
     st.session_state['avg_annual_rainfall_from_api'] = 1500.0 # Default fallback
+if 'climate_normals_from_api' not in st.session_state:
+    st.session_state['climate_normals_from_api'] = None # Monthly climatology for crop growing seasons
+if 'prefetch_subscriber' not in st.session_state:
+    st.session_state['prefetch_subscriber'] = uuid.uuid4().hex # Identifies this session's background fetches
+
+# --- Background fetches for the entered city ---
+def start_city_prefetch():
+    # on_change of the city input: drop the previous city's queued work and start on the new one
+    previous = st.session_state.get('city_prefetch')
+    if previous is not None:
+        prefetcher.release(previous, st.session_state['prefetch_subscriber'])
+    st.session_state['city_prefetch'] = prefetcher.start(st.session_state['city_name_input'], st.session_state['prefetch_subscriber'])
+
+def city_prefetch(city_name):
+    # This session's fetches for city_name, started again if the input has not been prefetched yet,
+    # a fetch failed (so a click retries it) or the results are older than PREFETCH_TTL_SECONDS
+    current = st.session_state.get('city_prefetch')
+    if current is None or not current.matches(city_name) or current.needs_refresh():
+        start_city_prefetch()
+    return st.session_state['city_prefetch']
+
+# --- Display helpers shared by the fetch buttons ---
+def show_current_weather(city_name, weather):
+    st.success(f"Current Weather for {city_name}:")
+    st.markdown(f"- **Temperature:** **{weather.temp}°C**")
+    st.markdown(f"- **Humidity:** **{weather.humidity}%**")
+    st.markdown(f"- **Conditions:** **{weather.description.capitalize()}**")
+    st.info("💡 Note: This is current weather. For yield prediction, the model relies on simulated *seasonal averages* below.")
+
+def show_climate_normals(city_name, normals):
+    st.success(f"Climate Averages for {city_name} ({normals.start_year}-{normals.end_year}):")
+    st.markdown(f"- **Average Annual Temperature:** **{normals.avg_temp:.2f}°C**")
+    st.markdown(f"- **Average Annual Rainfall:** **{normals.avg_annual_rainfall:.2f} mm/year**")
+    if normals.seasonal_rainfall is not None:
+        st.markdown(f"- **Wettest-Season Rainfall:** **{normals.seasonal_rainfall:.2f} mm/month**")
+    for season in growing_seasons(normals).values():
+        humidity_text = f", {season.humidity:.0f}% humidity" if season.humidity is not None else ""
+        st.markdown(f"- **{season.crop.capitalize()} Growing Season ({season.label}):** "
+                    f"**{season.temperature:.1f}°C, {season.rainfall:.0f} mm/month{humidity_text}**")
+    # Store these values in Streamlit's session state to update sliders
+    st.session_state['avg_temp_from_api'] = normals.avg_temp
+    st.session_state['avg_annual_rainfall_from_api'] = normals.avg_annual_rainfall
+    st.session_state['climate_normals_from_api'] = normals
+
+def show_unknown_city(city_name):
+    st.error(f"❌ Could not find geographic coordinates for '{city_name}'. Please check the city name for typos and try again.")
+
+def show_fetch_error(error, api_name, activity):
+    # Network problems name the API that failed; anything else is reported as is
+    if isinstance(error, requests.exceptions.ConnectionError):
+        st.error(f"❌ Network error: Could not connect to {api_name} API. Please check your internet connection.")
+    elif isinstance(error, (requests.exceptions.Timeout, TimeoutError)):
+        st.error(f"❌ Network timeout: {api_name} API did not respond in time. Please try again shortly.")
+    else:
+        st.error(f"❌ An unexpected error occurred during {activity}: {error}")
+
+def show_weather_result(conditions):
+    # The located city's current weather, or why OpenWeather could not provide it
+    city_label = conditions.location.name # Use the name returned by API for accuracy
+    if conditions.weather is not None:
+        show_current_weather(city_label, conditions.weather)
+    elif isinstance(conditions.weather_error, WeatherServiceError):
+        st.error(f"❌ Could not fetch weather data for {city_label} from OpenWeather: {conditions.weather_error}. Please check your API key and try again.")
+    else:
+        show_fetch_error(conditions.weather_error, "OpenWeatherMap", "weather fetching")
+
+def show_climate_result(conditions):
+    # The located city's climate normals, or why Meteostat could not provide them
+    city_label = conditions.location.name
+    error = conditions.normals_error
+    if conditions.normals is not None:
+        # Sliders below are rendered later in this run, so they pick up the new defaults directly
+        show_climate_normals(city_label, conditions.normals)
+    elif isinstance(error, ImportError):
+        st.error("❌ The 'meteostat' library is not installed. Please install it using: `pip install meteostat`")
+    elif isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout, TimeoutError)):
+        show_fetch_error(error, "Meteostat", "climate data fetching")
+    elif error is not None:
+        st.error(f"❌ An error occurred while fetching climate data from Meteostat: {error}. Please ensure coordinates are valid and try again.")
+    else:
+        st.error(f"❌ No climate data available for {city_label} from Meteostat for the period {CLIMATE_START_DATE.year}-{CLIMATE_END_DATE.year}. This might happen for very remote locations or if all nearby stations lack data.")
+
+def clamp(value, low, high):
+    # Slider defaults must lie inside the slider's range
+    return min(max(float(value), low), high)
+
+def show_prediction_results(prediction, model_bundle):
+    selected_crop, land_area_ha = prediction.crop, prediction.land_area_ha
+    predicted_yield_per_ha = prediction.yield_per_ha
+    total_predicted_yield = prediction.total_yield
+    historical_avg_yield_per_ha = prediction.historical_avg_yield_per_ha
+
+    st.subheader("💡 Your Prediction Results:")
+    st.caption(f"Model version {model_bundle.version} ({model_bundle.backend} backend from the {model_bundle.source}, loaded in {model_bundle.load_seconds:.3f}s)")
+    col_pred1, col_pred2 = st.columns(2)
+    with col_pred1:
+        st.metric(label=f"Predicted {selected_crop.capitalize()} Yield (per hectare)", value=f"{predicted_yield_per_ha:.2f} tonnes/ha 🌾")
+    with col_pred2:
+        st.metric(label=f"Total Predicted Yield for {land_area_ha:.0f} ha", value=f"{total_predicted_yield:.2f} tonnes 🚚")
+
+    # Spread of the forest's individual trees (same batched evaluation as the prediction)
+    spread = prediction.tree_spread
+    st.caption(f"📏 {round((spread.interval[1] - spread.interval[0]) * 100)}% range across the model's {spread.n_samples} trees: "
+               f"{spread.low:.2f} – {spread.high:.2f} tonnes/ha")
+
+    st.markdown("---")
+
+    st.subheader("📈 Yield Comparison & Scenario Insights:")
+    st.write(f"The historical average yield for {selected_crop.capitalize()} is: **{historical_avg_yield_per_ha:.2f} tonnes/hectare**.")
+    st.write(f"Share of model trees predicting a yield above the historical average: **{spread.prob_above_historical * 100:.0f}%**.")
+
+    if predicted_yield_per_ha > historical_avg_yield_per_ha:
+        st.success(f"🎉 **Strong Performance!** Under these simulated conditions, the predicted yield is **{((predicted_yield_per_ha - historical_avg_yield_per_ha)/historical_avg_yield_per_ha * 100):.2f}% higher** than the historical average. This indicates highly favorable conditions or optimized inputs, highlighting potential for **significant ROI**.")
+    elif predicted_yield_per_ha < historical_avg_yield_per_ha:
+        st.warning(f"⚠️ **Potential Challenges!** Under these simulated conditions, the predicted yield is **{((historical_avg_yield_per_ha - predicted_yield_per_ha)/historical_avg_yield_per_ha * 100):.2f}% lower** than the historical average. This signals potential climate challenges or suboptimal inputs, emphasizing the need for **adaptive strategies and targeted investments** to mitigate risks.")
+    else:
+        st.info("The predicted yield is aligned with the historical average, suggesting stable conditions.")
+
+    st.markdown("---")
+
+    # --- Nutrient and Pesticide Calculation for Land Area ---
+    st.subheader(f"🌱 Resource Optimization for {land_area_ha:.0f} Hectares:")
+    st.markdown("These are the estimated resource needs for your specified land area, based on historical averages.")
+
+    resources = prediction.resources
+
+    col_res1, col_res2, col_res3, col_res4 = st.columns(4)
+    with col_res1:
+        st.metric("Nitrogen (N) Needed", f"{resources.nitrogen_kg:.2f} kg")
+    with col_res2:
+        st.metric("Phosphorus (P) Needed", f"{resources.phosphorus_kg:.2f} kg")
+    with col_res3:
+        st.metric("Potassium (K) Needed", f"{resources.potassium_kg:.2f} kg")
+    with col_res4:
+        st.metric("Pesticides Needed", f"{resources.pesticides_tonnes:.2f} tonnes")
+
+    st.info("💡 Note: These estimations are based on average historical usage from the training data, scaled by your input land area. Actual requirements may vary based on specific soil tests, crop varietals, and local agricultural practices.")
+
+    st.markdown("---")
+
+def show_section_timings(section_trace):
+    # Per-section line of the opt-in timing panel; fragment reruns do not reach the sidebar panel
+    if section_trace is not None:
+        stages = ", ".join(f"{row['stage']} {row['duration_ms']:.1f} ms" for row in section_trace.rows())
+        st.caption(f"⏱️ Section ran in {section_trace.elapsed() * 1000:.1f} ms" + (f" ({stages})" if stages else ""))
 
 # Updated page_title and main title to "RootPredict"
 st.set_page_config(page_title="RootPredict: Climate-Resilient Yield & Resource Planner", page_icon="📈", layout="centered")
 
+# --- Opt-in diagnostics: per-rerun stage timings (ROOTPREDICT_DEBUG_PANEL=1 or ?debug=1 in the URL) ---
+show_timings = False
+if settings.DEBUG_PANEL or st.query_params.get("debug") == "1":
+    show_timings = st.sidebar.toggle("⏱️ Show stage timings", key="show_timings", help="Time each backend stage (geocoding, weather, Meteostat, model) on every rerun.")
+page_trace = metrics.begin_trace(active=show_timings)
+
 # --- Custom CSS for enhanced aesthetics ---
 st.markdown("""
 <style>
@@ -196,50 +360,29 @@ with st.container():
 
     col1, col2 = st.columns(2)
     with col1:
-        crop_options = ["maize", "rice"] # Keep current crop options
-        selected_crop = st.selectbox("🌿 Select Crop Type:", crop_options, help="Choose the crop for which you want to predict yield and plan resources.")
+        crop_options = available_crops # Crops in crops.json whose model files are present
+        selected_crop = st.selectbox("🌿 Select Crop Type:", crop_options, format_func=lambda crop: crop_registry.crop(crop).label, help="Choose the crop for which you want to predict yield and plan resources.")
     with col2:
         land_area_ha = st.number_input("🚜 Enter Land Area (hectares):", min_value=1.0, max_value=10000.0, value=10.0, step=1.0, help="Specify the total land area for your agricultural operation.")
 
     st.subheader("📍 Global Weather & Location Details:")
-    city_name_input = st.text_input("🌍 Enter City Name (e.g., Paris, Mumbai, Lebowakgomo):", "Lebowakgomo", help="Type the name of any city worldwide to get its current weather.")
+    city_name_input = st.text_input("🌍 Enter City Name (e.g., Paris, Mumbai, Lebowakgomo):", "Lebowakgomo", key="city_name_input", on_change=start_city_prefetch if settings.PREFETCH_ENABLED else None, help="Type the name of any city worldwide to get its current weather.")
+    if settings.PREFETCH_ENABLED:
+        city_prefetch(city_name_input) # The default city counts as settled too, so start on the first run
 
     # --- Fetch Current Weather Data (for demonstration of API integration) ---
     if st.button(f"🌤️ Fetch Current Weather for {city_name_input}"):
         with st.spinner(f"Fetching current weather data for {city_name_input}..."):
-            # Step 1: Geocoding - Convert city name to lat/lon using OpenWeather
-            geocode_url = f"http://api.openweathermap.org/geo/1.0/direct?q={city_name_input}&limit=1&appid={OPENWEATHER_API_KEY}"
             try:
-                geo_response = requests.get(geocode_url)
-                geo_data = geo_response.json()
-
-                if geo_response.status_code == 200 and geo_data:
-                    lat = geo_data[0]['lat']
-                    lon = geo_data[0]['lon']
-                    actual_city_name = geo_data[0]['name'] # Use the name returned by API for accuracy
-
-                    # Step 2: Fetch Current Weather
-                    weather_url = f"https://api.openweathermap.org/data/2.5/weather?lat={lat}&lon={lon}&appid={OPENWEATHER_API_KEY}&units=metric"
-                    weather_response = requests.get(weather_url)
-                    weather_data = weather_response.json()
-
-                    if weather_response.status_code == 200:
-                        temp = weather_data['main']['temp']
-                        humidity = weather_data['main']['humidity']
-                        weather_desc = weather_data['weather'][0]['description']
-                        st.success(f"Current Weather for {actual_city_name}:")
-                        st.markdown(f"- **Temperature:** **{temp}°C**")
-                        st.markdown(f"- **Humidity:** **{humidity}%**")
-                        st.markdown(f"- **Conditions:** **{weather_desc.capitalize()}**")
-                        st.info("💡 Note: This is current weather. For yield prediction, the model relies on simulated *seasonal averages* below.")
-                    else:
-                        st.error(f"❌ Could not fetch weather data for {actual_city_name} from OpenWeather: {weather_data.get('message', 'Unknown error')}. Please check your API key and try again.")
+                # Geocoding and the current weather were fetched in the background once the city was entered;
+                # this only waits if they are still running
+                conditions = city_prefetch(city_name_input).result("weather")
+                if conditions.location is None:
+                    show_unknown_city(city_name_input)
                 else:
-                    st.error(f"❌ Could not find geographic coordinates for '{city_name_input}'. Please check the city name for typos and try again.")
-            except requests.exceptions.ConnectionError:
-                st.error("❌ Network error: Could not connect to OpenWeatherMap API. Please check your internet connection.")
+                    show_weather_result(conditions)
             except Exception as e:
-                st.error(f"❌ An unexpected error occurred during weather fetching: {e}")
+                show_fetch_error(e, "OpenWeatherMap", "weather fetching")
     
     # New section for fetching historical averages using Meteostat
     st.subheader("🗓️ Fetch Historical Climate Averages (Meteostat)")
@@ -247,202 +390,283 @@ with st.container():
     if st.button(f"Fetch Climate Averages for {city_name_input}", key="fetch_climate_averages_btn"):
         with st.spinner(f"Fetching 10-year climate averages for {city_name_input} from Meteostat..."):
             try:
-                # Step 1: Geocoding (reuse existing logic from current weather fetch with OpenWeather)
-                geocode_url = f"http://api.openweathermap.org/geo/1.0/direct?q={city_name_input}&limit=1&appid={OPENWEATHER_API_KEY}"
-                geo_response = requests.get(geocode_url)
-                geo_data = geo_response.json()
-
-                if geo_response.status_code == 200 and geo_data:
-                    lat = geo_data[0]['lat']
-                    lon = geo_data[0]['lon']
-                    actual_city_name_for_avg = geo_data[0]['name']
-
-                    st.write(f"DEBUG: Geocoded {city_name_input} to Lat: {lat}, Lon: {lon}")
-                    
-                    # Step 2: Fetch historical data using Meteostat
-                    try:
-                        from meteostat import Point, Daily # Import Meteostat classes here
-
-                        # Define the 10-year period (from 2015-01-01 to 2024-12-31)
-                        start_date_meteostat = datetime(2015, 1, 1) 
-                        end_date_meteostat = datetime(2024, 12, 31)
-
-                        # Create a Point for the location
-                        location_point = Point(lat, lon) 
-
-                        # Get daily data for the 10-year period
-                        data = Daily(location_point, start_date_meteostat, end_date_meteostat)
-                        data = data.fetch() # Fetch data into a Pandas DataFrame
-
-                        if data is not None and not data.empty:
-                            # Meteostat columns: 'tavg' for average temperature, 'prcp' for precipitation sum
-                            avg_temp_over_period = data['tavg'].mean()
-                            total_precipitation_over_period = data['prcp'].sum()
-
-                            # Calculate annual average precipitation from total
-                            num_full_years = (end_date_meteostat.year - start_date_meteostat.year) + 1
-                            if num_full_years == 0: num_full_years = 1 # Avoid division by zero for periods less than a year
-                            avg_annual_precipitation = total_precipitation_over_period / num_full_years
-
-                            st.success(f"Climate Averages for {actual_city_name_for_avg} ({start_date_meteostat.year}-{end_date_meteostat.year}):")
-                            st.markdown(f"- **Average Annual Temperature:** **{avg_temp_over_period:.2f}°C**")
-                            st.markdown(f"- **Average Annual Rainfall:** **{avg_annual_precipitation:.2f} mm/year**")
-                            
-                            # Store these values in Streamlit's session state to update sliders
-                            st.session_state['avg_temp_from_api'] = avg_temp_over_period
-                            st.session_state['avg_annual_rainfall_from_api'] = avg_annual_precipitation
-                            st.rerun() # Using st.rerun()
-                            
-                        else:
-                            st.error(f"❌ No climate data available for {actual_city_name_for_avg} from Meteostat for the period {start_date_meteostat.year}-{end_date_meteostat.year}. This might happen for very remote locations or if all nearby stations lack data.")
-                    except ImportError:
-                        st.error("❌ The 'meteostat' library is not installed. Please install it using: `pip install meteostat`")
-                    except Exception as e:
-                        st.error(f"❌ An error occurred while fetching climate data from Meteostat: {e}. Please ensure coordinates are valid and try again.")
+                # Geocoding (shared with the current weather) and the climate normals for the location were
+                # started in the background; the normals come from the on-disk cache when this grid cell was
+                # fetched before, otherwise from Meteostat
+                conditions = city_prefetch(city_name_input).result("climate")
+                if conditions.location is None:
+                    show_unknown_city(city_name_input)
                 else:
-                    st.error(f"❌ Could not find geographic coordinates for '{city_name_input}'. Please check the city name for typos.")
-            except requests.exceptions.ConnectionError:
-                st.error("❌ Network error: Could not connect to OpenWeatherMap/Meteostat API. Please check your internet connection.")
+                    show_climate_result(conditions)
             except Exception as e:
-                st.error(f"❌ An unexpected error occurred during climate data fetching: {e}")
+                show_fetch_error(e, "OpenWeatherMap/Meteostat", "climate data fetching")
+
+    # Both results for the same city, from the same background fetches (geocoded once)
+    if st.button(f"⚡ Fetch Weather & Climate Averages Together for {city_name_input}", key="fetch_both_btn"):
+        with st.spinner(f"Fetching current weather and climate averages for {city_name_input} in parallel..."):
+            try:
+                conditions = city_prefetch(city_name_input).conditions()
+                if conditions.location is None:
+                    show_unknown_city(city_name_input)
+                else:
+                    show_weather_result(conditions)
+                    show_climate_result(conditions)
+            except Exception as e:
+                show_fetch_error(e, "OpenWeatherMap/Meteostat", "weather and climate data fetching")
     st.markdown("---")
 
-# --- Simulate Climate & Soil Inputs for Prediction ---
-with st.container():
-    st.header("📈 2. Simulate Seasonal & Soil Conditions")
-    st.markdown(
-        "Adjust these parameters to model potential future climate conditions and "
-        "customize soil nutrient and pesticide levels for your crop. These values are used by the AI model for yield prediction."
-    )
-
-    st.subheader("☀️ Climate Change Scenario:")
-    # Scenario options - now with dynamic defaults if API values are loaded
-    scenario_options = {
-        "Baseline (Current Climate)": {"temp_offset": 0.0, "rainfall_factor": 1.0},
-        "Moderate Warming (+1.5°C)": {"temp_offset": 1.5, "rainfall_factor": 0.9}, # 10% less rain
-        "Severe Warming (+3.0°C)": {"temp_offset": 3.0, "rainfall_factor": 0.75} # 25% less rain
-    }
-    selected_scenario_name = st.selectbox("Select Climate Scenario:", list(scenario_options.keys()), help="Choose a scenario to see its potential impact on yield and resource needs.")
-    temp_offset = scenario_options[selected_scenario_name]["temp_offset"]
-    rainfall_factor = scenario_options[selected_scenario_name]["rainfall_factor"]
+# --- Sections 2 & 3 run as one fragment: moving a slider re-executes only this part of the page ---
+def render_scenario_and_prediction_sections(selected_crop, land_area_ha):
+    # --- Simulate Climate & Soil Inputs for Prediction ---
+    with st.container():
+        st.header("📈 2. Simulate Seasonal & Soil Conditions")
+        st.markdown(
+            "Adjust these parameters to model potential future climate conditions and "
+            "customize soil nutrient and pesticide levels for your crop. These values are used by the AI model for yield prediction."
+        )
+
+        st.subheader("☀️ Climate Change Scenario:")
+        # Scenario options (rootpredict/engine.py) - now with dynamic defaults if API values are loaded
+        selected_scenario_name = st.selectbox("Select Climate Scenario:", list(SCENARIO_OPTIONS.keys()), help="Choose a scenario to see its potential impact on yield and resource needs.")
+
+        # Use session state values if available, otherwise fall back to original defaults.
+        # With fetched climate data, the seasonal sliders start from the selected crop's growing season.
+        season = growing_season(st.session_state['climate_normals_from_api'], selected_crop)
+        base_temp_for_sliders = season.temperature if season else st.session_state['avg_temp_from_api']
+        base_rainfall_for_sliders = st.session_state['avg_annual_rainfall_from_api']
+        base_seasonal_rainfall = season.rainfall if season else 150.0
+        base_humidity = season.humidity if season and season.humidity is not None else 75.0
+        if season:
+            st.caption(f"🗓️ Climate defaults use the {selected_crop} growing season {season.label} ({season.months} wettest consecutive months).")
+
+        # Default values for sliders, adjusted by scenario and (now) fetched API data
+        scenario_defaults = apply_scenario({'temperature': base_temp_for_sliders, 'rainfall': base_seasonal_rainfall,
+                                            'average_rain_fall_mm_per_year': base_rainfall_for_sliders}, selected_scenario_name)
+        sim_avg_temp_default = scenario_defaults['temperature']
+        sim_seasonal_rainfall_default = scenario_defaults['rainfall']
+        sim_avg_rainfall_default = scenario_defaults['average_rain_fall_mm_per_year']
+
+        col_clim1, col_clim2 = st.columns(2)
+        with col_clim1:
+            # Temperature slider value updated from API
+            sim_temp = st.slider("🌡️ Average Seasonal Temperature (°C):", min_value=15.0, max_value=35.0, 
+                                 value=round(clamp(sim_avg_temp_default, 15.0, 35.0), 1), # Use calculated default including API data
+                                 step=0.1, help="Average temperature over the growing season.")
+            sim_humidity = st.slider("💧 Average Seasonal Humidity (%):", min_value=30.0, max_value=95.0, value=round(clamp(base_humidity, 30.0, 95.0), 1), step=0.1, help="Average humidity over the growing season.")
+            sim_ph = st.slider("🧪 Soil pH Level:", min_value=4.0, max_value=9.0, value=6.5, step=0.1, help="The acidity or alkalinity of the soil.")
+        with col_clim2:
+            sim_rainfall_current = st.slider("🌧️ Seasonal Rainfall (mm/month):", min_value=50.0, max_value=300.0, value=float(round(clamp(sim_seasonal_rainfall_default, 50.0, 300.0))), step=1.0, help="Average monthly rainfall over the growing season.")
+            # Average annual rainfall slider value updated from API
+            sim_avg_rain_fall = st.slider("☔ Average Annual Rainfall (mm/year):", min_value=500.0, max_value=3000.0, 
+                                           value=float(round(clamp(sim_avg_rainfall_default, 500.0, 3000.0), -1)), # Use calculated default including API data
+                                           step=10.0, help="Long-term average annual rainfall for the region.")
+
+        st.subheader("🔬 Soil Nutrients & Pesticide Levels (per hectare baseline):")
+        st.markdown("Adjust the baseline nutrient and pesticide levels. These are scaled by your land area.")
+        crop_inputs = crop_registry.crop(selected_crop).inputs_per_ha # Historical per-hectare averages from crops.json
+        col_nut1, col_nut2, col_nut3, col_nut4 = st.columns(4)
+        with col_nut1:
+            sim_N = st.slider("🌱 Nitrogen (N) (kg/ha):", min_value=0, max_value=140, value=int(crop_inputs['N']), help="Nitrogen is crucial for leaf growth and overall plant vigor.")
+        with col_nut2:
+            sim_P = st.slider("🪨 Phosphorus (P) (kg/ha):", min_value=0, max_value=140, value=int(crop_inputs['P']), help="Phosphorus supports root development, flowering, and fruiting.")
+        with col_nut3:
+            sim_K = st.slider("✨ Potassium (K) (kg/ha):", min_value=0, max_value=140, value=int(crop_inputs['K']), help="Potassium aids in water regulation, nutrient transport, and disease resistance.")
+        with col_nut4:
+            sim_pesticides_tonnes_input = st.slider("🐛 Pesticides (tonnes/ha base):", min_value=0.0, max_value=500.0, value=crop_inputs['pesticides_tonnes'], step=1.0, help="Simulated pesticide usage baseline per hectare.")
+
+        st.markdown("---")
+
+    # --- Prediction & Results Section ---
+    with st.container():
+        st.header("📈 3. Prediction & Impact Analysis")
+        st.markdown("Run the AI model to predict crop yield and calculate necessary resources based on your chosen scenario.")
     
-    # Use session state values if available, otherwise fall back to original defaults
-    base_temp_for_sliders = st.session_state['avg_temp_from_api']
-    base_rainfall_for_sliders = st.session_state['avg_annual_rainfall_from_api']
-
-    # Default values for sliders, adjusted by scenario and (now) fetched API data
-    sim_avg_temp_default = base_temp_for_sliders + temp_offset
-    sim_avg_rainfall_default = base_rainfall_for_sliders * rainfall_factor
-
-    col_clim1, col_clim2 = st.columns(2)
-    with col_clim1:
-        # Temperature slider value updated from API
-        sim_temp = st.slider("🌡️ Average Seasonal Temperature (°C):", min_value=15.0, max_value=35.0, 
-                             value=sim_avg_temp_default, # Use calculated default including API data
-                             step=0.1, help="Average temperature over the growing season.")
-        sim_humidity = st.slider("💧 Average Seasonal Humidity (%):", min_value=30.0, max_value=95.0, value=75.0, step=0.1, help="Average humidity over the growing season.")
-        sim_ph = st.slider("🧪 Soil pH Level:", min_value=4.0, max_value=9.0, value=6.5, step=0.1, help="The acidity or alkalinity of the soil.")
-    with col_clim2:
-        sim_rainfall_current = st.slider("🌧️ Total Seasonal Rainfall (mm):", min_value=50.0, max_value=300.0, value=150.0, step=1.0, help="Total rainfall expected during the growing season.")
-        # Average annual rainfall slider value updated from API
-        sim_avg_rain_fall = st.slider("☔ Average Annual Rainfall (mm/year):", min_value=500.0, max_value=3000.0, 
-                                       value=sim_avg_rainfall_default, # Use calculated default including API data
-                                       step=10.0, help="Long-term average annual rainfall for the region.")
-
-    st.subheader("🔬 Soil Nutrients & Pesticide Levels (per hectare baseline):")
-    st.markdown("Adjust the baseline nutrient and pesticide levels. These are scaled by your land area.")
-    col_nut1, col_nut2, col_nut3, col_nut4 = st.columns(4)
-    with col_nut1:
-        sim_N = st.slider("🌱 Nitrogen (N) (kg/ha):", min_value=0, max_value=140, value=int(AVG_NUTRIENT_PESTICIDE_PER_HA[selected_crop]['N']), help="Nitrogen is crucial for leaf growth and overall plant vigor.")
-    with col_nut2:
-        sim_P = st.slider("🪨 Phosphorus (P) (kg/ha):", min_value=0, max_value=140, value=int(AVG_NUTRIENT_PESTICIDE_PER_HA[selected_crop]['P']), help="Phosphorus supports root development, flowering, and fruiting.")
-    with col_nut3:
-        sim_K = st.slider("✨ Potassium (K) (kg/ha):", min_value=0, max_value=140, value=int(AVG_NUTRIENT_PESTICIDE_PER_HA[selected_crop]['K']), help="Potassium aids in water regulation, nutrient transport, and disease resistance.")
-    with col_nut4:
-        sim_pesticides_tonnes_input = st.slider("🐛 Pesticides (tonnes/ha base):", min_value=0.0, max_value=500.0, value=AVG_NUTRIENT_PESTICIDE_PER_HA[selected_crop]['pesticides_tonnes_per_ha_base'], step=1.0, help="Simulated pesticide usage baseline per hectare.")
+        # Prepare the scenario for the prediction engine (rootpredict/engine.py)
+        scenario = ScenarioInputs(
+            crop=selected_crop,
+            N=sim_N,
+            P=sim_P,
+            K=sim_K,
+            temperature=sim_temp,
+            humidity=sim_humidity,
+            ph=sim_ph,
+            rainfall=sim_rainfall_current,
+            average_rain_fall_mm_per_year=sim_avg_rain_fall,
+            pesticides_tonnes=sim_pesticides_tonnes_input,
+            land_area_ha=land_area_ha,
+        )
 
-    st.markdown("---")
+        # Live mode re-scores on every (debounced) slider change; otherwise the button triggers the prediction
+        live_prediction = st.toggle("⚡ Live prediction (update results as you move the sliders)", key="live_prediction",
+                                    help="Re-scores automatically with the cached model after a short pause in slider movement.")
+        if live_prediction:
+            if st.session_state.get("live_scenario") != scenario:
+                # A newer slider change arriving during this pause replaces this run before anything is scored
+                time.sleep(LIVE_PREDICTION_DEBOUNCE_SECONDS)
+                st.session_state["live_scenario"] = scenario
+            run_prediction = True
+        else:
+            run_prediction = st.button("🚀 Predict Yield & Calculate Resources", type="primary")
+        if run_prediction:
+            with st.spinner("Calculating predictions and resource estimates..."):
+                try:
+                    # Make prediction (the model is cached per process and reloads if the .pkl files change)
+                    prediction = engine.predict(scenario)
+                    model_bundle = engine.bundle_for(selected_crop)
+                    show_prediction_results(prediction, model_bundle)
+                except Exception as e:
+                    st.error(f"❌ Error during prediction: {e}. Please check your inputs and ensure the model is loaded correctly.")
+
+        # --- Monte Carlo Climate Uncertainty ---
+        st.subheader("🎲 Climate Uncertainty (Monte Carlo)")
+        if st.toggle("Estimate the yield range when the season's climate varies around your inputs", key="show_monte_carlo", help="Draws thousands of climate variations and scores them all in one batch."):
+            col_mc1, col_mc2 = st.columns(2)
+            with col_mc1:
+                mc_samples = st.select_slider("Climate draws:", options=[500, 1000, 2000, 5000, 10000], value=2000)
+                mc_temp_sd = st.slider("🌡️ Temperature variability (± °C, 1 s.d.):", min_value=0.0, max_value=3.0, value=1.0, step=0.1)
+            with col_mc2:
+                mc_rain_cv = st.slider("🌧️ Rainfall variability (± %, 1 s.d.):", min_value=0, max_value=50, value=15, step=1)
+                mc_humidity_sd = st.slider("💧 Humidity variability (± %, 1 s.d.):", min_value=0.0, max_value=15.0, value=5.0, step=0.5)
+            try:
+                mc_result = engine.monte_carlo(scenario, n_samples=mc_samples, temp_sd=mc_temp_sd, rainfall_cv=mc_rain_cv / 100,
+                                               humidity_sd=mc_humidity_sd, seed=0)
+                col_mcr1, col_mcr2, col_mcr3 = st.columns(3)
+                with col_mcr1:
+                    st.metric("Median Yield", f"{mc_result.median:.2f} t/ha")
+                with col_mcr2:
+                    st.metric(f"{round((mc_result.interval[1] - mc_result.interval[0]) * 100)}% Range", f"{mc_result.low:.1f} – {mc_result.high:.1f}")
+                with col_mcr3:
+                    st.metric("Chance to Beat Historical", f"{mc_result.prob_above_historical * 100:.0f}%")
+                counts, edges = np.histogram(mc_result.samples, bins=30)
+                st.bar_chart(pd.DataFrame({"samples": counts}, index=pd.Index(np.round((edges[:-1] + edges[1:]) / 2, 1), name="yield (t/ha)")), height=200)
+                st.caption(f"{mc_samples:,} climate draws × {mc_result.n_samples // mc_samples} trees = {mc_result.n_samples:,} predictions, scored in one batch.")
+            except Exception as e:
+                st.error(f"❌ Error during the Monte Carlo run: {e}.")
+
+        # --- Climate Sensitivity Sweep ---
+        st.subheader("🧭 Climate Sensitivity Sweep")
+        if st.toggle("Explore a full grid of climate shifts around your current inputs", key="show_sweep", help="Scores every combination of temperature offset and rainfall factor (optionally humidity and pH) in one batch."):
+            col_sw1, col_sw2 = st.columns(2)
+            with col_sw1:
+                sweep_temp_range = st.slider("🌡️ Temperature offset range (°C):", min_value=-3.0, max_value=6.0, value=(-1.0, 4.0), step=0.5)
+                sweep_temp_steps = st.slider("Temperature steps:", min_value=3, max_value=41, value=11)
+                sweep_humidity = st.checkbox("💧 Also sweep humidity (30–95%)", help="Adds a humidity axis; the heatmap then shows the average over it.")
+            with col_sw2:
+                sweep_rain_range = st.slider("🌧️ Rainfall factor range (×):", min_value=0.3, max_value=1.5, value=(0.6, 1.2), step=0.05)
+                sweep_rain_steps = st.slider("Rainfall steps:", min_value=3, max_value=41, value=13)
+                sweep_ph = st.checkbox("🧪 Also sweep soil pH (4.0–9.0)", help="Adds a pH axis; the heatmap then shows the average over it.")
 
-# --- Prediction & Results Section ---
-with st.container():
-    st.header("📈 3. Prediction & Impact Analysis")
-    st.markdown("Run the AI model to predict crop yield and calculate necessary resources based on your chosen scenario.")
-    
-    # Predict button at the bottom of inputs, before results
-    if st.button("🚀 Predict Yield & Calculate Resources", type="primary"):
-        with st.spinner("Calculating predictions and resource estimates..."):
             try:
-                # Prepare input data for the model
-                input_data = {
-                    'N': sim_N,
-                    'P': sim_P,
-                    'K': sim_K,
-                    'temperature': sim_temp, 
-                    'humidity': sim_humidity,
-                    'ph': sim_ph,
-                    'rainfall': sim_rainfall_current, 
-                    'average_rain_fall_mm_per_year': sim_avg_rain_fall,
-                    'pesticides_tonnes': sim_pesticides_tonnes_input, 
-                    'avg_temp': sim_temp,
-                    'label_maize': 1 if selected_crop == 'maize' else 0,
-                    'label_rice': 1 if selected_crop == 'rice' else 0
-                }
-
-                input_df = pd.DataFrame([input_data])
-                input_df = input_df[model_features] # Ensure column order
-
-                # Make prediction
-                predicted_yield_per_ha = model.predict(input_df)[0]
-                total_predicted_yield = predicted_yield_per_ha * land_area_ha
-
-                historical_avg_yield_per_ha = HISTORICAL_AVG_YIELDS.get(selected_crop, 0)
-                
-                st.subheader("💡 Your Prediction Results:")
-                col_pred1, col_pred2 = st.columns(2)
-                with col_pred1:
-                    st.metric(label=f"Predicted {selected_crop.capitalize()} Yield (per hectare)", value=f"{predicted_yield_per_ha:.2f} tonnes/ha 🌾")
-                with col_pred2:
-                    st.metric(label=f"Total Predicted Yield for {land_area_ha:.0f} ha", value=f"{total_predicted_yield:.2f} tonnes 🚚")
-                
-                st.markdown("---")
-
-                st.subheader("📈 Yield Comparison & Scenario Insights:")
-                st.write(f"The historical average yield for {selected_crop.capitalize()} is: **{historical_avg_yield_per_ha:.2f} tonnes/hectare**.")
-
-                if predicted_yield_per_ha > historical_avg_yield_per_ha:
-                    st.success(f"🎉 **Strong Performance!** Under these simulated conditions, the predicted yield is **{((predicted_yield_per_ha - historical_avg_yield_per_ha)/historical_avg_yield_per_ha * 100):.2f}% higher** than the historical average. This indicates highly favorable conditions or optimized inputs, highlighting potential for **significant ROI**.")
-                elif predicted_yield_per_ha < historical_avg_yield_per_ha:
-                    st.warning(f"⚠️ **Potential Challenges!** Under these simulated conditions, the predicted yield is **{((historical_avg_yield_per_ha - predicted_yield_per_ha)/historical_avg_yield_per_ha * 100):.2f}% lower** than the historical average. This signals potential climate challenges or suboptimal inputs, emphasizing the need for **adaptive strategies and targeted investments** to mitigate risks.")
-                else:
-                    st.info("The predicted yield is aligned with the historical average, suggesting stable conditions.")
-                
-                st.markdown("---")
-
-                # --- Nutrient and Pesticide Calculation for Land Area ---
-                st.subheader(f"🌱 Resource Optimization for {land_area_ha:.0f} Hectares:")
-                st.markdown("These are the estimated resource needs for your specified land area, based on historical averages.")
-                
-                avg_n_per_ha = AVG_NUTRIENT_PESTICIDE_PER_HA[selected_crop]['N']
-                avg_p_per_ha = AVG_NUTRIENT_PESTICIDE_PER_HA[selected_crop]['P']
-                avg_k_per_ha = AVG_NUTRIENT_PESTICIDE_PER_HA[selected_crop]['K']
-                avg_pesticides_per_ha_base = AVG_NUTRIENT_PESTICIDE_PER_HA[selected_crop]['pesticides_tonnes_per_ha_base'] 
-
-                col_res1, col_res2, col_res3, col_res4 = st.columns(4)
-                with col_res1:
-                    st.metric("Nitrogen (N) Needed", f"{avg_n_per_ha * land_area_ha:.2f} kg")
-                with col_res2:
-                    st.metric("Phosphorus (P) Needed", f"{avg_p_per_ha * land_area_ha:.2f} kg")
-                with col_res3:
-                    st.metric("Potassium (K) Needed", f"{avg_k_per_ha * land_area_ha:.2f} kg")
-                with col_res4:
-                    st.metric("Pesticides Needed", f"{avg_pesticides_per_ha_base * land_area_ha:.2f} tonnes")
-                
-                st.info("💡 Note: These estimations are based on average historical usage from the training data, scaled by your input land area. Actual requirements may vary based on specific soil tests, crop varietals, and local agricultural practices.")
-                
-                st.markdown("---")
+                sweep_result = run_sweep(
+                    engine, scenario,
+                    temp_offsets=np.linspace(*sweep_temp_range, sweep_temp_steps),
+                    rainfall_factors=np.linspace(*sweep_rain_range, sweep_rain_steps),
+                    humidity_values=np.linspace(30.0, 95.0, 14) if sweep_humidity else None,
+                    ph_values=np.linspace(4.0, 9.0, 11) if sweep_ph else None,
+                )
+                st.caption(f"{sweep_result.n_points:,} scenario points scored in one batch. Base scenario: {sweep_result.base_yield:.2f} tonnes/ha.")
+
+                heatmap = alt.Chart(sweep_result.surface()).mark_rect().encode(
+                    x=alt.X("temp_offset:O", title="Temperature offset (°C)", axis=alt.Axis(format=".1f")),
+                    y=alt.Y("rainfall_factor:O", title="Rainfall factor (×)", sort="descending", axis=alt.Axis(format=".2f")),
+                    color=alt.Color("yield_t_per_ha:Q", title="Yield (t/ha)", scale=alt.Scale(scheme="greens")),
+                    tooltip=[alt.Tooltip("temp_offset:Q", format=".2f"), alt.Tooltip("rainfall_factor:Q", format=".2f"), alt.Tooltip("yield_t_per_ha:Q", format=".2f")],
+                )
+                st.altair_chart(heatmap, width="stretch")
+
+                st.markdown("**Partial dependence** (average predicted yield along each axis, other axes averaged out):")
+                pd_columns = st.columns(len(sweep_result.axes))
+                for pd_column, axis_name in zip(pd_columns, sweep_result.axes):
+                    with pd_column:
+                        st.caption(axis_name.replace("_", " ").capitalize())
+                        st.line_chart(sweep_result.partial_dependence(axis_name), height=180)
+            except Exception as e:
+                st.error(f"❌ Error during the scenario sweep: {e}.")
 
+        # --- Input Optimizer ---
+        st.subheader("🧮 Input Optimizer")
+        if st.toggle("Recommend N, P, K and pesticide levels for this climate and crop", key="show_optimizer", help="Searches the slider ranges coarse-to-fine, scoring thousands of input combinations per batch."):
+            try:
+                recommendation = recommend_inputs(engine, scenario)
+                col_opt1, col_opt2 = st.columns(2)
+                with col_opt1:
+                    st.metric("Best Predicted Yield", f"{recommendation.yield_per_ha:.2f} t/ha",
+                              delta=f"{recommendation.yield_gain_pct:+.2f}% vs your inputs")
+                with col_opt2:
+                    st.metric(f"Total for {land_area_ha:.0f} ha", f"{recommendation.yield_per_ha * land_area_ha:.2f} tonnes")
+                totals = recommendation.totals
+                st.dataframe(pd.DataFrame({
+                    "Input": ["Nitrogen (N)", "Phosphorus (P)", "Potassium (K)", "Pesticides"],
+                    "Your level (per ha)": [sim_N, sim_P, sim_K, sim_pesticides_tonnes_input],
+                    "Recommended (per ha)": [recommendation.inputs[name] for name in ("N", "P", "K", "pesticides_tonnes")],
+                    f"Recommended total ({land_area_ha:.0f} ha)": [totals[name] for name in ("N", "P", "K", "pesticides_tonnes")],
+                    "Unit": ["kg", "kg", "kg", "tonnes"],
+                }), hide_index=True, width="stretch")
+                st.caption(f"{recommendation.evaluations:,} input combinations scored over {recommendation.iterations} refinement rounds"
+                           f"{' (converged)' if recommendation.converged else ''}. Equal-yield options are resolved towards the lowest input use; "
+                           f"this one uses {recommendation.input_index * 100:.0f}% of the historical average.")
             except Exception as e:
-                st.error(f"❌ Error during prediction: {e}. Please check your inputs and ensure the model is loaded correctly.")
+                st.error(f"❌ Error during input optimization: {e}.")
+
+
+@st.fragment
+def scenario_and_prediction_sections(selected_crop, land_area_ha):
+    with metrics.traced(active=st.session_state.get("show_timings", False)) as section_trace:
+        render_scenario_and_prediction_sections(selected_crop, land_area_ha)
+        show_section_timings(section_trace)
+
+scenario_and_prediction_sections(selected_crop, land_area_ha)
+
+# --- Batch Scoring Section (its own fragment, so uploads and downloads leave the rest of the page alone) ---
+def render_batch_scoring_section():
+    with st.container():
+        st.header("🗂️ 4. Batch Scoring for Many Plots")
+        st.markdown(
+            "Planning hundreds of plots? Upload a CSV or Parquet file with one row per plot and score them all at once. "
+            "Required columns: " + ", ".join(f"`{col}`" for col in BATCH_REQUIRED_COLUMNS) + " (optional: `avg_temp`)."
+        )
+        st.download_button("📄 Download Example CSV", data=batch_template_csv(), file_name="rootpredict_plots_template.csv", mime="text/csv")
+
+        uploaded_plots = st.file_uploader("Upload plots file", type=["csv", "parquet"], help="One row per plot. Extra columns (e.g. plot IDs) are kept in the results.")
+        if uploaded_plots is not None:
+            with st.spinner("Scoring all plots..."):
+                try:
+                    plots_df = read_plots(uploaded_plots, uploaded_plots.name)
+                    batch_start = time.perf_counter()
+                    batch_results = engine.score_frame(plots_df)
+                    batch_seconds = time.perf_counter() - batch_start
+
+                    st.success(f"Scored {len(batch_results):,} plots in {batch_seconds:.2f}s.")
+                    col_b1, col_b2, col_b3 = st.columns(3)
+                    with col_b1:
+                        st.metric("Plots Scored", f"{len(batch_results):,}")
+                    with col_b2:
+                        st.metric("Total Area", f"{batch_results['area_ha'].sum():,.0f} ha")
+                    with col_b3:
+                        st.metric("Total Predicted Yield", f"{batch_results['predicted_total_yield_t'].sum():,.0f} tonnes")
+                    st.dataframe(batch_results.head(100), width="stretch")
+
+                    output_format = "parquet" if uploaded_plots.name.lower().endswith((".parquet", ".pq")) else "csv"
+                    st.download_button(
+                        f"⬇️ Download Results ({output_format.upper()})",
+                        data=results_to_bytes(batch_results, output_format),
+                        file_name=f"rootpredict_results.{output_format}",
+                        mime="text/csv" if output_format == "csv" else "application/octet-stream",
+                    )
+                except BatchInputError as e:
+                    st.error(f"❌ {e}")
+                except Exception as e:
+                    st.error(f"❌ Error during batch scoring: {e}. Please check the file format and try again.")
+        st.markdown("---")
+
+
+@st.fragment
+def batch_scoring_section():
+    with metrics.traced(active=st.session_state.get("show_timings", False)) as section_trace:
+        render_batch_scoring_section()
+        show_section_timings(section_trace)
+
+batch_scoring_section()
 
 # --- SDG Alignment Section ---
 with st.container():
@@ -473,4 +697,33 @@ with st.container():
         )
 
 st.markdown("---")
-st.caption("Developed as an AI Solution for the UN SDGs by Your Name/Team Name")
\ No newline at end of file
+st.caption("Developed as an AI Solution for the UN SDGs by Your Name/Team Name")
+
+# --- Debug panel: what this rerun spent its time on (rendered last so every stage is included) ---
+if page_trace is not None:
+    with st.sidebar:
+        st.subheader("⏱️ Stage Timings (this rerun)")
+        st.caption(f"Script run so far: {page_trace.elapsed() * 1000:.1f} ms")
+        span_rows = page_trace.rows()
+        if span_rows:
+            st.dataframe(pd.DataFrame(span_rows), hide_index=True, width="stretch")
+        else:
+            st.caption("No instrumented stage ran on this rerun.")
+        if page_trace.cache_events:
+            st.dataframe(pd.DataFrame([{"cache": cache, "result": result, "count": count}
+                                       for (cache, result), count in sorted(page_trace.cache_events.items())]),
+                         hide_index=True, width="stretch")
+        st.subheader("🧠 Loaded Models")
+        registry_stats = crop_registry.stats()
+        st.dataframe(pd.DataFrame(registry_stats["models"]), hide_index=True, width="stretch")
+        st.caption(f"{registry_stats['cache']['size']} of at most {registry_stats['cache']['max_entries']} models in memory "
+                   f"({registry_stats['cache']['total_weight'] / 2**20:.1f} of {registry_stats['cache']['max_weight'] / 2**20:.0f} MiB), "
+                   f"{registry_stats['cache']['evictions']} evicted.")
+        with st.expander("Process metrics (Prometheus format)"):
+            if metrics.is_enabled():
+                st.code(metrics.render_prometheus(), language="text")
+            else:
+                st.caption("Process-wide recording is off. Set ROOTPREDICT_METRICS=1 (or ROOTPREDICT_METRICS_PORT) to collect histograms.")
+
+# The run is over: a fragment rerun on its own must not add to this run's trace
+metrics.end_trace()
@@ -0,0 +1,86 @@
+"""Per-call inference latency: the page's original DataFrame + sklearn path vs FlatForest.
+
+Also checks that both backends agree before timing anything. Run from the repo root:
+
+    python benchmarks/bench_inference.py
+"""
+import os
+import sys
+import time
+import tracemalloc
+import warnings
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rootpredict.fast_forest import FlatForest, max_parity_error, parity_sample  # noqa: E402
+from rootpredict.model_store import ModelStore  # noqa: E402
+
+
+def time_call(fn, repeat):
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    samples = np.array(samples) * 1e3
+    return np.median(samples), np.percentile(samples, 95)
+
+
+def main():
+    warnings.filterwarnings("ignore")
+    bundle = ModelStore(backend="sklearn").get()
+    model, features = bundle.model, bundle.features
+    flat = FlatForest.from_sklearn(model)
+    print(f"forest: {flat.n_trees} trees, {len(flat.value)} nodes, max depth {flat.max_depth}, {flat.nbytes() / 1024:.1f} KiB")
+
+    # Parity on rows spanning every split range, plus a large batch
+    X = parity_sample(flat, n_rows=10_000, seed=1)
+    error = max_parity_error(flat, lambda rows: model.predict(pd.DataFrame(rows, columns=features)), X)
+    print(f"parity: max |flat - sklearn| = {error:.3g} over {len(X)} rows")
+    if error > 1e-6:
+        raise SystemExit("FAIL: backends disagree")
+
+    row = X[:1]
+    row_dict = dict(zip(features, row[0]))
+
+    def original_page_path():
+        # What app.py did on every click: one-row DataFrame, reorder, model.predict
+        input_df = pd.DataFrame([row_dict])[features]
+        return model.predict(input_df)[0]
+
+    print(f"\n{'path':<34}{'rows':>7}{'median ms':>12}{'p95 ms':>10}")
+    median, p95 = time_call(original_page_path, 50)
+    print(f"{'DataFrame + sklearn predict':<34}{1:>7}{median:>12.3f}{p95:>10.3f}")
+    median, p95 = time_call(lambda: flat.predict(row), 500)
+    print(f"{'FlatForest.predict':<34}{1:>7}{median:>12.3f}{p95:>10.3f}")
+
+    for n_rows in (100, 1_000, 10_000):
+        batch = X[:n_rows]
+        batch_df = pd.DataFrame(batch, columns=features)
+        median, p95 = time_call(lambda: model.predict(batch_df), 10)
+        print(f"{'sklearn predict':<34}{n_rows:>7}{median:>12.3f}{p95:>10.3f}")
+        median, p95 = time_call(lambda: flat.predict(batch), 10)
+        print(f"{'FlatForest.predict':<34}{n_rows:>7}{median:>12.3f}{p95:>10.3f}")
+
+    # The largest sweep grid (41 x 41 x 14 x 11 points): time and peak memory, including the
+    # default bundle's routing (only pickle-sourced bundles hand large batches to scikit-learn)
+    large = parity_sample(flat, n_rows=41 * 41 * 14 * 11, seed=2)
+    default_bundle = ModelStore().get()
+    print(f"\n{'path':<34}{'rows':>7}{'median ms':>12}{'peak MB':>10}")
+    for name, predict in (("sklearn predict", lambda: model.predict(pd.DataFrame(large, columns=features))),
+                          ("FlatForest.predict", lambda: flat.predict(large)),
+                          (f"ModelBundle.predict ({default_bundle.source})", lambda: default_bundle.predict(large))):
+        median, _ = time_call(predict, 3)
+        tracemalloc.start()
+        predict()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+        print(f"{name:<34}{len(large):>7}{median:>12.3f}{peak_mb:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,300 @@
+"""Reproducible, offline benchmark suite for the RootPredict app.
+
+Measures each stage cold (fresh process or emptied caches) and warm (repeated,
+caches populated) and writes percentiles to a JSON file for comparing commits:
+
+    python benchmarks/run_benchmarks.py                         # writes bench_results.json
+    python benchmarks/run_benchmarks.py --compare old.json      # also prints % change per stage
+    python benchmarks/run_benchmarks.py --weather-latency 0.2 --meteostat-latency 2.0
+
+OpenWeather is replaced by a local HTTP stub and Meteostat by an in-process stub
+(see benchmarks/stubs.py); nothing leaves the machine. The page itself is
+driven through Streamlit's AppTest harness.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP_PATH = os.path.join(REPO_ROOT, "app.py")
+sys.path.insert(0, REPO_ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import stubs  # noqa: E402
+
+# Rows in the largest sweep grid the page offers (41 x 41 x 14 x 11)
+LARGE_BATCH_ROWS = 41 * 41 * 14 * 11
+
+
+def summarize(samples):
+    ms = np.asarray(samples, dtype=np.float64) * 1e3
+    return {"n": int(ms.size), "mean_ms": float(ms.mean()), "p50_ms": float(np.percentile(ms, 50)),
+            "p90_ms": float(np.percentile(ms, 90)), "p99_ms": float(np.percentile(ms, 99)),
+            "max_ms": float(ms.max())}
+
+
+def timed(fn, repeat, before=None):
+    samples = []
+    for _ in range(repeat):
+        if before is not None:
+            before()
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def setup_environment(args):
+    """Point the app at the stubs and at a throwaway cache directory. Must run before rootpredict imports."""
+    server, base_url = stubs.start_openweather_stub(latency=args.weather_latency)
+    os.environ["ROOTPREDICT_OPENWEATHER_URL"] = base_url
+    os.environ.setdefault("ROOTPREDICT_CACHE_DIR", tempfile.mkdtemp(prefix="rootpredict-bench-"))
+    stubs.install_meteostat_stub(latency=args.meteostat_latency)
+    return server
+
+
+def new_app_test():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP_PATH, default_timeout=120)
+    at.secrets["OPENWEATHER_API_KEY"] = "benchmark"
+    return at
+
+
+def cold_start_probe():
+    """Runs in a fresh interpreter: first page render and first model load, in seconds."""
+    warnings.filterwarnings("ignore")
+    start = time.perf_counter()
+    at = new_app_test()
+    at.run()
+    first_render = time.perf_counter() - start
+
+    from rootpredict.registry import get_registry
+
+    registry = get_registry()
+    start = time.perf_counter()
+    registry.bundle(registry.crop_names[0])
+    first_model_load = time.perf_counter() - start
+    print(json.dumps({"first_render": first_render, "first_model_load": first_model_load}))
+
+
+def bench_cold_start(args):
+    renders, loads = [], []
+    env = dict(os.environ, ROOTPREDICT_CACHE_DIR=tempfile.mkdtemp(prefix="rootpredict-bench-cold-"))
+    for _ in range(args.cold_repeat):
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--cold-start-probe",
+             "--weather-latency", str(args.weather_latency), "--meteostat-latency", str(args.meteostat_latency)],
+            capture_output=True, text=True, check=True, env=env, cwd=REPO_ROOT,
+        ).stdout.strip().splitlines()[-1]
+        probe = json.loads(output)
+        renders.append(probe["first_render"])
+        loads.append(probe["first_model_load"])
+    return {"app_first_render": {"cold": summarize(renders)}, "model_load": {"cold": summarize(loads)}}
+
+
+def bench_model_and_inference(args):
+    import pandas as pd
+
+    from rootpredict import optimizer
+    from rootpredict.engine import PredictionEngine, ScenarioInputs
+    from rootpredict.fast_forest import parity_sample
+    from rootpredict.model_store import ModelStore
+    from rootpredict.result_cache import PredictionCache
+
+    results = {}
+    store = ModelStore(artifact_path=None)  # The pickle path, which also provides the scikit-learn model
+    store._load("warmup")  # Keep the one-off joblib/scikit-learn import out of the warm samples
+    results["model_load"] = {"warm": summarize(timed(lambda: store._load("bench"), args.repeat // 4 or 1))}
+    artifact_store = ModelStore()
+    if artifact_store.artifact_path and os.path.exists(artifact_store.artifact_path):
+        results["model_load_artifact"] = {"warm": summarize(timed(lambda: artifact_store._load_artifact("bench"), args.repeat))}
+
+    bundle = store.get()
+    scenario = ScenarioInputs('maize', 78, 48, 20, 25.0, 75.0, 6.5, 150.0, 1500.0, 327.66, land_area_ha=10)
+    row = dict(zip(bundle.features, PredictionEngine.feature_matrix([scenario], bundle.features)[0]))
+
+    def original_page_predict():
+        # The pre-engine page path: one-row DataFrame, reorder, sklearn predict
+        bundle.model.predict(pd.DataFrame([row])[bundle.features])
+
+    results["predict_sklearn_dataframe"] = {"warm": summarize(timed(original_page_predict, args.repeat))}
+
+    cache = PredictionCache()
+    engine = PredictionEngine(store=store, cache=cache)
+    results["predict_engine"] = {
+        "cold": summarize(timed(lambda: engine.predict(scenario), args.repeat, before=cache.clear)),
+        "warm": summarize(timed(lambda: engine.predict(scenario), args.repeat)),
+    }
+
+    results["optimizer_search"] = {
+        "cold": summarize(timed(lambda: optimizer.recommend_inputs(engine, scenario), args.repeat // 4 or 1,
+                                before=optimizer._result_cache.clear)),
+        "warm": summarize(timed(lambda: optimizer.recommend_inputs(engine, scenario), args.repeat)),
+    }
+
+    # A batch the size of the largest sweep grid (41 x 41 x 14 x 11 points) through the default,
+    # artifact-backed bundle, which scores it block by block with FlatForest
+    default_bundle = ModelStore().get()
+    large_batch = parity_sample(default_bundle.fast, n_rows=LARGE_BATCH_ROWS)
+    results["predict_large_batch"] = {
+        "warm": summarize(timed(lambda: default_bundle.predict(large_batch), args.repeat // 20 or 1)),
+    }
+    return results
+
+
+def bench_fetch_flows(args):
+    from rootpredict.climate import ClimateNormals, ClimateNormalsCache
+    from rootpredict.climate_table import build_table, grid_locations
+    from rootpredict.geocoding import GeocodingService
+    from rootpredict.weather import fetch_city_conditions, fetch_current_weather
+
+    cache_dir = os.environ["ROOTPREDICT_CACHE_DIR"]
+    geocoder = GeocodingService("benchmark", db_path=os.path.join(cache_dir, "bench-geocode.sqlite3"))
+    climate = ClimateNormalsCache(db_path=os.path.join(cache_dir, "bench-climate.sqlite3"))
+
+    def geocode_weather():
+        location = geocoder.lookup("Lebowakgomo")
+        fetch_current_weather(location.lat, location.lon, "benchmark")
+
+    def geocode_meteostat():
+        location = geocoder.lookup("Lebowakgomo")
+        climate.get(location.lat, location.lon)
+
+    def both_parallel():
+        fetch_city_conditions("Lebowakgomo", "benchmark", geocoder, climate)
+
+    def reset():
+        geocoder.clear()
+        climate.invalidate()
+
+    # Precomputed table (21 x 21 points) around the stub's coordinates, built without the stub latency
+    table = build_table(grid_locations(-25.0, -23.0, 28.5, 30.5, 0.1),
+                        fetcher=lambda lat, lon, start, end: ClimateNormals(lat, lon, start.year, end.year, 20.0, 820.0, 120.0))
+
+    def table_lookup():
+        table.lookup(-24.2, 29.5)
+
+    repeat = args.fetch_repeat
+    return {
+        "climate_table_lookup": {"warm": summarize(timed(table_lookup, args.repeat))},
+        "geocode_weather": {"cold": summarize(timed(geocode_weather, repeat, before=reset)),
+                            "warm": summarize(timed(geocode_weather, repeat))},
+        "geocode_meteostat": {"cold": summarize(timed(geocode_meteostat, repeat, before=reset)),
+                              "warm": summarize(timed(geocode_meteostat, repeat))},
+        "weather_and_climate_parallel": {"cold": summarize(timed(both_parallel, repeat, before=reset)),
+                                         "warm": summarize(timed(both_parallel, repeat))},
+    }
+
+
+def bench_app_reruns(args):
+    at = new_app_test()
+    at.run()
+    temperature = at.slider[0]
+
+    def rerun():
+        at.run()
+
+    def slider_rerun():
+        temperature.set_value(round(20.0 + np.random.uniform(0, 10), 1)).run()
+
+    def click_predict():
+        next(b for b in at.button if "Predict" in b.label).click().run()
+
+    def click_weather():
+        next(b for b in at.button if "Current Weather" in b.label).click().run()
+
+    results = {
+        "app_rerun": {"warm": summarize(timed(rerun, args.repeat // 2 or 1))},
+        "app_slider_change": {"warm": summarize(timed(slider_rerun, args.repeat // 2 or 1))},
+        "app_predict_click": {"warm": summarize(timed(click_predict, args.repeat // 2 or 1))},
+        "app_weather_click": {"warm": summarize(timed(click_weather, args.fetch_repeat))},
+    }
+    if at.exception:
+        raise RuntimeError(f"app raised during benchmark: {at.exception[0].value}")
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=REPO_ROOT, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def print_report(report, baseline=None):
+    print(f"\n{'stage':<32}{'mode':<6}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'n':>5}{'vs base':>10}")
+    for stage, modes in report["stages"].items():
+        for mode, stats in modes.items():
+            change = ""
+            if baseline is not None:
+                old = baseline.get("stages", {}).get(stage, {}).get(mode)
+                if old:
+                    change = f"{(stats['p50_ms'] / old['p50_ms'] - 1) * 100:+.0f}%"
+            print(f"{stage:<32}{mode:<6}{stats['p50_ms']:>10.2f}{stats['p90_ms']:>10.2f}"
+                  f"{stats['p99_ms']:>10.2f}{stats['n']:>5}{change:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=os.path.join(REPO_ROOT, "bench_results.json"))
+    parser.add_argument("--compare", help="Earlier results file to compare p50s against")
+    parser.add_argument("--repeat", type=int, default=200, help="Samples for fast in-process stages")
+    parser.add_argument("--fetch-repeat", type=int, default=10, help="Samples for network-stub stages")
+    parser.add_argument("--cold-repeat", type=int, default=3, help="Fresh interpreters for cold start")
+    parser.add_argument("--weather-latency", type=float, default=0.05, help="OpenWeather stub latency (s)")
+    parser.add_argument("--meteostat-latency", type=float, default=0.5, help="Meteostat stub latency (s)")
+    parser.add_argument("--skip-cold-start", action="store_true")
+    parser.add_argument("--cold-start-probe", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    server = setup_environment(args)
+    if args.cold_start_probe:
+        cold_start_probe()
+        return 0
+
+    warnings.filterwarnings("ignore")
+    stages = {}
+    sections = [bench_model_and_inference, bench_fetch_flows, bench_app_reruns]
+    if not args.skip_cold_start:
+        sections.insert(0, bench_cold_start)
+    for section in sections:
+        print(f"running {section.__name__} ...", file=sys.stderr)
+        for stage, modes in section(args).items():
+            stages.setdefault(stage, {}).update(modes)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "weather_latency_s": args.weather_latency,
+            "meteostat_latency_s": args.meteostat_latency,
+        },
+        "stages": stages,
+    }
+    with open(args.output, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2)
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            baseline = json.load(fh)
+    print_report(report, baseline)
+    print(f"\nwrote {args.output}", file=sys.stderr)
+    server.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
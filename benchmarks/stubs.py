@@ -0,0 +1,83 @@
+"""Offline stand-ins for OpenWeather and Meteostat with configurable latency.
+
+``start_openweather_stub`` serves the two OpenWeather endpoints the app uses on
+a local port; point the app at it with ROOTPREDICT_OPENWEATHER_URL.
+``install_meteostat_stub`` replaces the ``meteostat`` module in ``sys.modules``
+with one whose ``Monthly(...).fetch()`` sleeps and returns synthetic monthly rows.
+"""
+import json
+import sys
+import threading
+import time
+import types
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+import pandas as pd
+
+
+def start_openweather_stub(latency=0.05):
+    """Start the stub server in a daemon thread; returns (server, base_url)."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            query = parse_qs(url.query)
+            time.sleep(server.latency)
+            if url.path == "/geo/1.0/direct":
+                city = query.get("q", ["Lebowakgomo"])[0].title()
+                body = [{"name": city, "lat": -24.2, "lon": 29.5, "country": "ZA"}]
+            elif url.path == "/data/2.5/weather":
+                body = {"main": {"temp": 21.5, "humidity": 40}, "weather": [{"description": "clear sky"}]}
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    server.latency = latency
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def install_meteostat_stub(latency=0.5):
+    """Install a fake ``meteostat`` module; returns it so latency can be changed later."""
+    module = types.ModuleType("meteostat")
+    module.latency = latency
+
+    class Point:
+        def __init__(self, lat, lon, alt=None):
+            self.lat, self.lon = lat, lon
+
+    class Monthly:
+        def __init__(self, loc, start=None, end=None, *args, **kwargs):
+            self.loc, self.start, self.end = loc, start, end
+
+        def fetch(self):
+            time.sleep(module.latency)
+            index = pd.date_range(self.start, self.end, freq="MS")
+            seasonal = np.sin(2 * np.pi * index.dayofyear.to_numpy() / 365.25)
+            # Monthly totals: wet half-year at 4 mm/day, dry half at 0.5 mm/day
+            prcp = np.where(seasonal > 0, 4.0, 0.5) * 30.4
+            return pd.DataFrame({
+                "tavg": 20.0 + 6.0 * seasonal,
+                "tmin": 13.0 + 6.0 * seasonal,
+                "tmax": 27.0 + 6.0 * seasonal,
+                "prcp": prcp,
+            }, index=index)
+
+    module.Point = Point
+    module.Monthly = Monthly
+    sys.modules["meteostat"] = module
+    return module
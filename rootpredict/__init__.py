@@ -0,0 +1,5 @@
+"""Backend helpers for the RootPredict Streamlit app.
+
+Nothing in this package imports streamlit, so the modules can be reused from
+scripts and scheduled jobs as well as from app.py.
+"""
@@ -0,0 +1,5 @@
+import sys
+
+from rootpredict.cli import main
+
+sys.exit(main())
@@ -0,0 +1,165 @@
+"""Score many plots at once from a CSV or Parquet upload.
+
+The interactive page predicts one scenario per click. Here a whole table of
+plots is turned into one feature matrix per model (with vectorized one-hot crop
+columns), scored in fixed-size chunks so memory stays bounded, and the
+per-plot resource totals are computed column-wise rather than row by row.
+"""
+import io
+
+import numpy as np
+import pandas as pd
+
+from rootpredict import metrics
+from rootpredict.registry import INPUT_NAMES, UnscorableCropError
+
+# Columns every uploaded plot needs (avg_temp is optional and defaults to temperature,
+# matching the interactive page which feeds the seasonal temperature to both features)
+REQUIRED_COLUMNS = [
+    'crop', 'area_ha', 'N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall',
+    'average_rain_fall_mm_per_year', 'pesticides_tonnes',
+]
+
+# Rows scored per predict call; bounds the feature block and per-tree node arrays for a chunk
+DEFAULT_CHUNK_SIZE = 4096
+
+# Example rows offered as a download so users can see the expected layout
+TEMPLATE_ROWS = [
+    {'plot_id': 'north-field', 'crop': 'maize', 'area_ha': 12.5, 'N': 78, 'P': 48, 'K': 20,
+     'temperature': 24.5, 'humidity': 70.0, 'ph': 6.4, 'rainfall': 110.0,
+     'average_rain_fall_mm_per_year': 1100.0, 'pesticides_tonnes': 327.0},
+    {'plot_id': 'river-paddy', 'crop': 'rice', 'area_ha': 4.0, 'N': 80, 'P': 47, 'K': 40,
+     'temperature': 26.0, 'humidity': 82.0, 'ph': 6.0, 'rainfall': 230.0,
+     'average_rain_fall_mm_per_year': 1800.0, 'pesticides_tonnes': 369.0},
+]
+
+
+class BatchInputError(ValueError):
+    """The uploaded table cannot be scored (missing columns, unknown crops, bad values)."""
+
+
+def read_plots(source, filename):
+    """Read a CSV or Parquet file (path or file-like) into a DataFrame based on its extension."""
+    name = filename.lower()
+    if name.endswith('.parquet') or name.endswith('.pq'):
+        try:
+            return pd.read_parquet(source)
+        except ImportError:
+            raise BatchInputError("Reading Parquet files needs 'pyarrow'. Install it using: pip install pyarrow")
+    if name.endswith('.csv'):
+        return pd.read_csv(source)
+    raise BatchInputError(f"Unsupported file type for '{filename}'. Upload a .csv or .parquet file.")
+
+
+def validate_plots(plots, crops):
+    """Return a cleaned copy of ``plots`` or raise BatchInputError describing the problem.
+
+    ``crops`` are the supported crop names.
+    """
+    missing = [col for col in REQUIRED_COLUMNS if col not in plots.columns]
+    if missing:
+        raise BatchInputError(f"Missing required column(s): {', '.join(missing)}")
+
+    plots = plots.copy()
+    plots['crop'] = plots['crop'].astype(str).str.strip().str.lower()
+    unknown = sorted(set(plots['crop']) - set(crops))
+    if unknown:
+        raise BatchInputError(f"Unknown crop(s): {', '.join(unknown)}. Supported: {', '.join(crops)}")
+
+    numeric = [col for col in REQUIRED_COLUMNS if col != 'crop']
+    if 'avg_temp' in plots.columns:
+        numeric.append('avg_temp')
+    plots[numeric] = plots[numeric].apply(pd.to_numeric, errors='coerce')
+    bad_rows = plots.index[plots[numeric].isna().any(axis=1)]
+    if len(bad_rows):
+        shown = ', '.join(str(i) for i in bad_rows[:10])
+        raise BatchInputError(f"{len(bad_rows)} row(s) have missing or non-numeric values (rows: {shown})")
+    return plots
+
+
+def build_feature_matrix(plots, model_features):
+    """Assemble the model's feature matrix (rows x model_features) without a per-row loop."""
+    matrix = np.empty((len(plots), len(model_features)), dtype=np.float64)
+    crops = plots['crop'].to_numpy()
+    for j, feature in enumerate(model_features):
+        if feature.startswith('label_'):
+            # One-hot crop indicator, e.g. label_maize is 1.0 where crop == 'maize'
+            matrix[:, j] = crops == feature[len('label_'):]
+        elif feature == 'avg_temp' and 'avg_temp' not in plots.columns:
+            matrix[:, j] = plots['temperature'].to_numpy(dtype=np.float64)
+        else:
+            matrix[:, j] = plots[feature].to_numpy(dtype=np.float64)
+    return matrix
+
+
+def predict_in_chunks(bundle, matrix, chunk_size=DEFAULT_CHUNK_SIZE):
+    """bundle.predict over row chunks so the per-call working set stays bounded."""
+    predictions = np.empty(len(matrix), dtype=np.float64)
+    for start in range(0, len(matrix), chunk_size):
+        predictions[start:start + chunk_size] = bundle.predict(matrix[start:start + chunk_size])
+    return predictions
+
+
+def score_plots(plots, registry, bundle_for=None, chunk_size=DEFAULT_CHUNK_SIZE, adjust=None):
+    """Predict yield and resource totals for every plot; returns a new DataFrame.
+
+    ``registry`` is a ModelRegistry (rootpredict.registry) giving each crop's model and
+    reference values; ``bundle_for(crop)`` returns the loaded model for a crop (default:
+    ``registry.bundle``). ``adjust(plots)``, if given, transforms the validated plots before
+    they are scored (e.g. a climate scenario). Plots are scored in one pass per model.
+    """
+    plots = validate_plots(plots, registry.crops)
+    if adjust is not None:
+        plots = adjust(plots)
+    bundle_for = bundle_for or registry.bundle
+    crop_specs = registry.crops
+    model_ids = plots['crop'].map({name: spec.model_id for name, spec in crop_specs.items()}).to_numpy()
+
+    try:
+        bundles = {crop: bundle_for(crop) for crop in plots['crop'].unique()}
+    except UnscorableCropError as e:
+        raise BatchInputError(str(e)) from None
+
+    yield_per_ha = np.empty(len(plots), dtype=np.float64)
+    for model_id in dict.fromkeys(model_ids):
+        rows = np.flatnonzero(model_ids == model_id)
+        group = plots if len(rows) == len(plots) else plots.iloc[rows]
+        bundle = bundles[group['crop'].iat[0]]
+        with metrics.span("batch.features"):
+            matrix = build_feature_matrix(group, bundle.features)
+        with metrics.span("batch.predict"):
+            yield_per_ha[rows] = predict_in_chunks(bundle, matrix, chunk_size)
+
+    area = plots['area_ha'].to_numpy(dtype=np.float64)
+    historical = plots['crop'].map({name: spec.historical_yield for name, spec in crop_specs.items()})
+    historical = historical.to_numpy(dtype=np.float64)
+    results = plots.copy()
+    results['predicted_yield_t_per_ha'] = yield_per_ha
+    results['predicted_total_yield_t'] = yield_per_ha * area
+    results['historical_avg_yield_t_per_ha'] = historical
+    results['vs_historical_pct'] = (yield_per_ha - historical) / historical * 100
+
+    # Resource needs scale the crop's historical per-hectare averages by plot area
+    per_ha = pd.DataFrame.from_dict({name: spec.inputs_per_ha for name, spec in crop_specs.items()},
+                                    orient='index', columns=list(INPUT_NAMES))
+    per_ha_rows = per_ha.reindex(plots['crop']).to_numpy(dtype=np.float64)
+    for j, column in enumerate(per_ha.columns):
+        total_name = 'pesticides_needed_t' if column.startswith('pesticides') else f'{column}_needed_kg'
+        results[total_name] = per_ha_rows[:, j] * area
+    return results
+
+
+def results_to_bytes(results, fmt='csv'):
+    """Serialize scored results for st.download_button ('csv' or 'parquet')."""
+    if fmt == 'parquet':
+        buffer = io.BytesIO()
+        try:
+            results.to_parquet(buffer, index=False)
+        except ImportError:
+            raise BatchInputError("Writing Parquet files needs 'pyarrow'. Install it using: pip install pyarrow")
+        return buffer.getvalue()
+    return results.to_csv(index=False).encode('utf-8')
+
+
+def template_csv():
+    return pd.DataFrame(TEMPLATE_ROWS).to_csv(index=False).encode('utf-8')
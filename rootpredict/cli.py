@@ -0,0 +1,108 @@
+"""Command-line batch scoring for scheduled jobs.
+
+Rows are streamed from a CSV file (or stdin) in shards, each shard is scored
+in a worker process, and results are written out in input order as soon as
+they are ready, so memory stays flat however large the input is::
+
+    python -m rootpredict score plots.csv -o results.csv --workers 8
+    cat plots.csv | python -m rootpredict score --scenario severe --format jsonl > results.jsonl
+"""
+import argparse
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from rootpredict.batch import REQUIRED_COLUMNS, BatchInputError
+from rootpredict.engine import SCENARIO_KEYS, get_engine
+
+DEFAULT_SHARD_SIZE = 5000
+
+
+def _warm_worker():
+    # Load the models once per worker process rather than on its first shard
+    get_engine().registry.preload()
+
+
+def _score_shard(plots, scenario_name):
+    return get_engine().score_frame(plots, scenario_name)
+
+
+def _read_shards(source, shard_size):
+    import pandas as pd
+
+    return pd.read_csv(source, chunksize=shard_size)
+
+
+def _write_shard(results, out, fmt, first):
+    if fmt == "jsonl":
+        results.to_json(out, orient="records", lines=True)
+    else:
+        results.to_csv(out, index=False, header=first)
+    out.flush()
+
+
+def score_stream(source, out, shard_size=DEFAULT_SHARD_SIZE, workers=None, scenario_name=None, fmt="csv"):
+    """Score CSV rows from ``source`` shard by shard and write them to ``out``; returns the row count.
+
+    With more than one worker, up to ``2 * workers`` shards are in flight at a time.
+    """
+    workers = workers or os.cpu_count() or 1
+    written = 0
+    first = True
+
+    if workers == 1:
+        for shard in _read_shards(source, shard_size):
+            results = _score_shard(shard, scenario_name)
+            _write_shard(results, out, fmt, first)
+            first = False
+            written += len(results)
+        return written
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_warm_worker) as pool:
+        pending = deque()
+        for shard in _read_shards(source, shard_size):
+            pending.append(pool.submit(_score_shard, shard, scenario_name))
+            # Drain finished shards in order so output stays ordered and memory bounded
+            while len(pending) >= 2 * workers or (pending and pending[0].done()):
+                results = pending.popleft().result()
+                _write_shard(results, out, fmt, first)
+                first = False
+                written += len(results)
+        while pending:
+            results = pending.popleft().result()
+            _write_shard(results, out, fmt, first)
+            first = False
+            written += len(results)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m rootpredict",
+                                     description="RootPredict yield model, without the web UI.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    score = sub.add_parser("score", help="Score a CSV of plots",
+                           description="Required columns: " + ", ".join(REQUIRED_COLUMNS) + " (optional: avg_temp).")
+    score.add_argument("input", nargs="?", default="-", help="CSV file to read (default: stdin)")
+    score.add_argument("-o", "--output", default="-", help="File to write (default: stdout)")
+    score.add_argument("--format", choices=["csv", "jsonl"], default="csv")
+    score.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    score.add_argument("--shard-size", type=int, default=DEFAULT_SHARD_SIZE, help="Rows per worker task")
+    score.add_argument("--scenario", choices=sorted(SCENARIO_KEYS),
+                       help="Apply a climate scenario's temperature offset and rainfall factor to every row")
+
+    args = parser.parse_args(argv)
+    scenario_name = SCENARIO_KEYS[args.scenario] if args.scenario else None
+    source = sys.stdin if args.input == "-" else args.input
+    out = sys.stdout if args.output == "-" else open(args.output, "w", newline="", encoding="utf-8")
+    try:
+        count = score_stream(source, out, args.shard_size, args.workers, scenario_name, args.format)
+    except BatchInputError as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 2
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"scored {count} rows", file=sys.stderr)
+    return 0
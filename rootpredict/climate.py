@@ -0,0 +1,317 @@
+"""Long-term climate normals from Meteostat, cached on disk per grid cell.
+
+Fetching ten years of Meteostat data for a point is the slowest step of the
+app, yet only a few numbers survive it: the mean temperature, the mean annual
+rainfall and a 12-month climatology. Those reduced values are stored in SQLite
+keyed by the coordinates rounded to a grid plus the date window, so nearby
+farms and repeat visits are answered without touching the network.
+
+Pre-warm the cache from a CSV with ``lat`` and ``lon`` columns::
+
+    python -m rootpredict.climate prewarm locations.csv
+
+For a whole service region, a precomputed table (rootpredict/climate_table.py)
+is consulted before this cache and answers without any I/O.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import datetime
+
+import numpy as np
+
+from rootpredict import metrics, settings
+
+# The 10-year window used by the app (2015-01-01 to 2024-12-31)
+DEFAULT_START = datetime(2015, 1, 1)
+DEFAULT_END = datetime(2024, 12, 31)
+
+
+@dataclass(frozen=True)
+class ClimateNormals:
+    lat: float                  # Grid-cell coordinates the data was fetched for
+    lon: float
+    start_year: int
+    end_year: int
+    avg_temp: float             # Mean monthly average temperature over the window (°C)
+    avg_annual_rainfall: float  # Mean yearly precipitation total (mm/year)
+    seasonal_rainfall: float = None  # Mean monthly rainfall of the wettest 3-month season (mm); None if unknown
+    # Jan..Dec climatology over the window (12 values each); None when not available
+    monthly_temp: tuple = None       # °C
+    monthly_rainfall: tuple = None   # mm/month
+    monthly_humidity: tuple = None   # % (only when the source reports relative humidity)
+
+    @classmethod
+    def from_dict(cls, payload):
+        payload = dict(payload)
+        for name in ("monthly_temp", "monthly_rainfall", "monthly_humidity"):
+            if payload.get(name) is not None:
+                payload[name] = tuple(payload[name])
+        return cls(**payload)
+
+
+def quantize(value, grid_degrees):
+    """Snap a coordinate to the centre of its grid cell."""
+    return round(round(value / grid_degrees) * grid_degrees, 6)
+
+
+def season_windows(monthly_values, months):
+    """(12, months) array: row ``m`` holds the ``months`` values starting at month index ``m``.
+
+    Windows wrap around the year end, so a November-March season is a single row.
+    """
+    index = (np.arange(12)[:, None] + np.arange(months)[None, :]) % 12
+    return np.asarray(monthly_values, dtype=np.float64)[index]
+
+
+def wettest_season_rainfall(monthly_rainfall, months=3):
+    """Mean monthly rainfall (mm) of the wettest ``months`` consecutive calendar months."""
+    return float(season_windows(monthly_rainfall, months).mean(axis=1).max())
+
+
+def monthly_climatology(data):
+    """Jan..Dec means of Meteostat monthly rows (12 rows; gaps filled with the yearly mean)."""
+    columns = [name for name in ('tavg', 'prcp', 'rhum') if name in data.columns]
+    climatology = data[columns].groupby(data.index.month).mean().reindex(range(1, 13))
+    return climatology.fillna(climatology.mean())
+
+
+def summarize_monthly(data, lat, lon, start=DEFAULT_START, end=DEFAULT_END):
+    """Reduce Meteostat monthly rows (columns 'tavg', 'prcp', optionally 'rhum') to ClimateNormals, or None."""
+    if data is None or data.empty or data['tavg'].isna().all():
+        return None
+
+    climatology = monthly_climatology(data)
+    # Meteostat monthly columns: 'tavg' is the month's mean temperature, 'prcp' its precipitation total
+    avg_temp = float(data['tavg'].mean())
+    rainfall = climatology['prcp'].to_numpy() if not climatology['prcp'].isna().all() else None
+    humidity = climatology['rhum'] if 'rhum' in climatology and not climatology['rhum'].isna().all() else None
+
+    return ClimateNormals(
+        lat=lat, lon=lon, start_year=start.year, end_year=end.year,
+        avg_temp=avg_temp,
+        avg_annual_rainfall=float(rainfall.sum()) if rainfall is not None else 0.0,
+        seasonal_rainfall=wettest_season_rainfall(rainfall) if rainfall is not None else None,
+        monthly_temp=tuple(float(v) for v in climatology['tavg']),
+        monthly_rainfall=tuple(float(v) for v in rainfall) if rainfall is not None else None,
+        monthly_humidity=tuple(float(v) for v in humidity) if humidity is not None else None,
+    )
+
+
+def fetch_climate_normals(lat, lon, start=DEFAULT_START, end=DEFAULT_END):
+    """Download monthly Meteostat data for a point and reduce it to ClimateNormals.
+
+    Ten years are about 120 monthly rows instead of ~3,650 daily ones, and carry
+    everything the growing-season features need (rootpredict/growing_season.py).
+    Returns None when Meteostat has no usable data for the location.
+    Raises ImportError if the meteostat package is not installed.
+    """
+    from meteostat import Point, Monthly # Imported lazily; it is only needed on a cache miss
+
+    with metrics.span("meteostat.fetch"):
+        data = Monthly(Point(lat, lon), start, end).fetch()
+    return summarize_monthly(data, lat, lon, start, end)
+
+
+class ClimateNormalsCache:
+    """SQLite cache of ClimateNormals keyed by (grid cell, date window)."""
+
+    def __init__(self, db_path=settings.CLIMATE_DB_PATH, grid_degrees=settings.CLIMATE_GRID_DEGREES,
+                 fetcher=fetch_climate_normals, table=None):
+        self.db_path = db_path
+        self.grid_degrees = grid_degrees
+        self._fetcher = fetcher
+        self.table = table  # Optional precomputed ClimateTable, consulted before SQLite
+        self._lock = threading.Lock()
+        self._conn = None
+        self.table_hits = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS climate_normals ("
+                " cell_lat REAL NOT NULL, cell_lon REAL NOT NULL, start_date TEXT NOT NULL,"
+                " end_date TEXT NOT NULL, payload TEXT NOT NULL, fetched_at REAL NOT NULL,"
+                " PRIMARY KEY (cell_lat, cell_lon, start_date, end_date))"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def cell_for(self, lat, lon):
+        return quantize(lat, self.grid_degrees), quantize(lon, self.grid_degrees)
+
+    def _key(self, lat, lon, start, end):
+        cell_lat, cell_lon = self.cell_for(lat, lon)
+        return cell_lat, cell_lon, start.date().isoformat(), end.date().isoformat()
+
+    def lookup(self, lat, lon, start=DEFAULT_START, end=DEFAULT_END):
+        """Return cached ClimateNormals for the cell containing (lat, lon), or None."""
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT payload FROM climate_normals WHERE cell_lat = ? AND cell_lon = ?"
+                " AND start_date = ? AND end_date = ?", self._key(lat, lon, start, end)
+            ).fetchone()
+        if row is None:
+            return None
+        payload = json.loads(row[0])
+        if payload.get("monthly_temp") is None:
+            return None  # Written before monthly climatology was stored; refetch to upgrade it
+        return ClimateNormals.from_dict(payload)
+
+    def get(self, lat, lon, start=DEFAULT_START, end=DEFAULT_END):
+        """Return climate normals for (lat, lon), fetching and storing them on a miss.
+
+        Points covered by the precomputed table are answered from it directly. Otherwise
+        the fetch uses the grid-cell centre so every point in a cell shares one entry.
+        Returns None if no data exists for the cell.
+        """
+        with metrics.span("climate.normals"):
+            if self.table is not None:
+                normals = self.table.lookup(lat, lon, start, end)
+                if normals is not None:
+                    self.table_hits += 1
+                    metrics.cache_result("climate_normals", "table_hit")
+                    return normals
+
+            normals = self.lookup(lat, lon, start, end)
+            if normals is not None:
+                self.hits += 1
+                metrics.cache_result("climate_normals", "hit")
+                return normals
+
+            self.misses += 1
+            metrics.cache_result("climate_normals", "miss")
+            cell_lat, cell_lon = self.cell_for(lat, lon)
+            normals = self._fetcher(cell_lat, cell_lon, start, end)
+            if normals is not None:
+                self.store(normals, start, end)
+            return normals
+
+    def store(self, normals, start=DEFAULT_START, end=DEFAULT_END):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO climate_normals"
+                " (cell_lat, cell_lon, start_date, end_date, payload, fetched_at) VALUES (?, ?, ?, ?, ?, ?)",
+                self._key(normals.lat, normals.lon, start, end) + (json.dumps(asdict(normals)), time.time()),
+            )
+            conn.commit()
+
+    def invalidate(self, lat=None, lon=None, start=None, end=None):
+        """Drop cached entries and return how many were removed.
+
+        With coordinates, only that grid cell is dropped (optionally for one date window);
+        without arguments the whole cache is cleared.
+        """
+        clauses, params = [], []
+        if lat is not None and lon is not None:
+            cell_lat, cell_lon = self.cell_for(lat, lon)
+            clauses += ["cell_lat = ?", "cell_lon = ?"]
+            params += [cell_lat, cell_lon]
+        if start is not None:
+            clauses.append("start_date = ?")
+            params.append(start.date().isoformat())
+        if end is not None:
+            clauses.append("end_date = ?")
+            params.append(end.date().isoformat())
+        where = " WHERE " + " AND ".join(clauses) if clauses else ""
+        with self._lock:
+            conn = self._connection()
+            removed = conn.execute("DELETE FROM climate_normals" + where, params).rowcount
+            conn.commit()
+        return removed
+
+    def prewarm(self, locations, start=DEFAULT_START, end=DEFAULT_END, refresh=False):
+        """Fill the cache for an iterable of (lat, lon) pairs.
+
+        Locations sharing a grid cell are fetched once. Returns a dict with
+        counts of cells fetched, already cached and without data.
+        """
+        summary = {"fetched": 0, "cached": 0, "no_data": 0}
+        seen = set()
+        for lat, lon in locations:
+            cell = self.cell_for(lat, lon)
+            if cell in seen:
+                continue
+            seen.add(cell)
+            if not refresh and self.lookup(lat, lon, start, end) is not None:
+                summary["cached"] += 1
+                continue
+            normals = self._fetcher(cell[0], cell[1], start, end)
+            if normals is None:
+                summary["no_data"] += 1
+            else:
+                self.store(normals, start, end)
+                summary["fetched"] += 1
+        return summary
+
+    def stats(self):
+        with self._lock:
+            entries = self._connection().execute("SELECT COUNT(*) FROM climate_normals").fetchone()[0]
+        stats = {"entries": entries, "hits": self.hits, "misses": self.misses,
+                 "grid_degrees": self.grid_degrees}
+        if self.table is not None:
+            stats["table_rows"] = len(self.table)
+            stats["table_hits"] = self.table_hits
+        return stats
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_climate_cache():
+    """Process-wide ClimateNormalsCache shared by all sessions."""
+    global _default_cache
+    with _default_cache_lock:
+        if _default_cache is None:
+            from rootpredict.climate_table import load_default_table
+
+            _default_cache = ClimateNormalsCache(table=load_default_table())
+        return _default_cache
+
+
+def _read_locations(path):
+    import pandas as pd
+
+    frame = pd.read_csv(path)
+    return list(zip(frame["lat"].astype(float), frame["lon"].astype(float)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m rootpredict.climate",
+                                     description="Manage the cached Meteostat climate normals.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    prewarm = sub.add_parser("prewarm", help="Fetch and cache normals for a CSV of lat/lon locations")
+    prewarm.add_argument("locations", help="CSV file with 'lat' and 'lon' columns")
+    prewarm.add_argument("--refresh", action="store_true", help="Re-fetch cells that are already cached")
+
+    invalidate = sub.add_parser("invalidate", help="Remove cached normals (all, or one location)")
+    invalidate.add_argument("--lat", type=float)
+    invalidate.add_argument("--lon", type=float)
+
+    sub.add_parser("stats", help="Show cache size and grid resolution")
+
+    args = parser.parse_args(argv)
+    cache = get_climate_cache()
+    if args.command == "prewarm":
+        print(json.dumps(cache.prewarm(_read_locations(args.locations), refresh=args.refresh)))
+    elif args.command == "invalidate":
+        print(json.dumps({"removed": cache.invalidate(lat=args.lat, lon=args.lon)}))
+    else:
+        print(json.dumps(cache.stats()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""Precomputed climate table for a service region with nearest-neighbour lookup.
+
+A batch job fetches Meteostat monthly data for every point of a grid (or a list
+of locations) on a process pool and keeps only the reduced values per point. The
+result is a directory of column files plus a small JSON header::
+
+    climate_table/
+        meta.json                 window, coverage radius, row count, build time
+        lat.npy lon.npy           point coordinates (degrees)
+        avg_temp.npy              °C
+        avg_annual_rainfall.npy   mm/year
+        seasonal_rainfall.npy     mm/month over the wettest 3-month season
+        monthly_temp.npy          (rows, 12) Jan..Dec climatology, °C
+        monthly_rainfall.npy      (rows, 12) mm/month
+        monthly_humidity.npy      (rows, 12) %, NaN where the source has no humidity
+
+Columns are opened with ``np.load(mmap_mode="r")``, so loading is instant and
+several server processes share the pages. Lookups go through a KD-tree on unit
+vectors (nearest by great-circle distance) and only answer within the coverage
+radius; everything outside it falls back to the live Meteostat path.
+
+Build a table for a bounding box or for a CSV of ``lat``,``lon`` points::
+
+    python -m rootpredict.climate_table build --bbox -26 -22 27 32 --step 0.1 --workers 8
+    python -m rootpredict.climate_table build --locations farms.csv --radius-km 15
+"""
+import argparse
+import json
+import logging
+import math
+import os
+import shutil
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+
+from rootpredict import settings
+from rootpredict.climate import DEFAULT_END, DEFAULT_START, ClimateNormals, fetch_climate_normals
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ("lat", "lon", "avg_temp", "avg_annual_rainfall", "seasonal_rainfall")
+MONTHLY_COLUMNS = ("monthly_temp", "monthly_rainfall", "monthly_humidity")
+EARTH_RADIUS_KM = 6371.0088
+FORMAT_VERSION = 2
+
+
+def _unit_vectors(lat, lon):
+    lat, lon = np.radians(lat), np.radians(lon)
+    cos_lat = np.cos(lat)
+    return np.column_stack([cos_lat * np.cos(lon), cos_lat * np.sin(lon), np.sin(lat)])
+
+
+def _chord_to_km(chord):
+    return 2.0 * EARTH_RADIUS_KM * np.arcsin(np.minimum(np.asarray(chord) / 2.0, 1.0))
+
+
+class ClimateTable:
+    """Column arrays of reduced climate values with a lazily built spatial index."""
+
+    def __init__(self, columns, meta):
+        self.columns = columns
+        self.meta = meta
+        self.start = datetime.fromisoformat(meta["start"])
+        self.end = datetime.fromisoformat(meta["end"])
+        self.radius_km = float(meta["radius_km"])
+        self._tree = None
+        self._tree_lock = threading.Lock()
+
+    def __len__(self):
+        return int(self.columns["lat"].shape[0])
+
+    @classmethod
+    def load(cls, path):
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as fh:
+            meta = json.load(fh)
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported climate table format {meta.get('format')!r}")
+        columns = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r") for name in COLUMNS + MONTHLY_COLUMNS}
+        return cls(columns, meta)
+
+    def save(self, path):
+        """Write the table to ``path``, replacing any previous table there in one step."""
+        staging = path.rstrip(os.sep) + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        for name in COLUMNS + MONTHLY_COLUMNS:
+            np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(self.columns[name], dtype=np.float32))
+        with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as fh:
+            json.dump(self.meta, fh, indent=2)
+        previous = path.rstrip(os.sep) + ".old"
+        if os.path.exists(path):
+            shutil.rmtree(previous, ignore_errors=True)
+            os.replace(path, previous)
+        os.replace(staging, path)
+        shutil.rmtree(previous, ignore_errors=True)
+
+    def _index(self):
+        if self._tree is None:
+            with self._tree_lock:
+                if self._tree is None:
+                    from scipy.spatial import cKDTree  # Only needed once a lookup happens
+
+                    self._tree = cKDTree(_unit_vectors(self.columns["lat"], self.columns["lon"]))
+        return self._tree
+
+    def nearest(self, lat, lon):
+        """(row index, distance in km) of the table point closest to (lat, lon)."""
+        chord, index = self._index().query(_unit_vectors([lat], [lon])[0])
+        return int(index), float(_chord_to_km(chord))
+
+    def lookup(self, lat, lon, start=DEFAULT_START, end=DEFAULT_END):
+        """ClimateNormals of the nearest point within the coverage radius, or None.
+
+        Also None when the requested date window differs from the one the table was built for.
+        """
+        if len(self) == 0 or start != self.start or end != self.end:
+            return None
+        index, distance_km = self.nearest(lat, lon)
+        if distance_km > self.radius_km:
+            return None
+        seasonal = float(self.columns["seasonal_rainfall"][index])
+        monthly = {}
+        for name in MONTHLY_COLUMNS:
+            values = np.asarray(self.columns[name][index], dtype=np.float64)
+            monthly[name] = None if np.isnan(values).any() else tuple(float(v) for v in values)
+        return ClimateNormals(lat=round(float(self.columns["lat"][index]), 5),
+                              lon=round(float(self.columns["lon"][index]), 5),
+                              start_year=self.start.year, end_year=self.end.year,
+                              avg_temp=float(self.columns["avg_temp"][index]),
+                              avg_annual_rainfall=float(self.columns["avg_annual_rainfall"][index]),
+                              seasonal_rainfall=None if math.isnan(seasonal) else seasonal,
+                              **monthly)
+
+
+def grid_locations(lat_min, lat_max, lon_min, lon_max, step):
+    """Every (lat, lon) on a regular grid over the bounding box, edges included."""
+    lats = np.arange(lat_min, lat_max + step / 2, step)
+    lons = np.arange(lon_min, lon_max + step / 2, step)
+    return [(round(float(a), 6), round(float(o), 6)) for a in lats for o in lons]
+
+
+def _fetch_point(args):
+    lat, lon, start, end = args
+    try:
+        return fetch_climate_normals(lat, lon, start, end)
+    except ImportError:  # meteostat missing: fail the build rather than write an empty table
+        raise
+    except Exception:  # One bad station must not sink a regional build
+        return None
+
+
+def build_table(locations, start=DEFAULT_START, end=DEFAULT_END, radius_km=25.0, workers=None,
+                fetcher=None):
+    """Fetch and reduce every location on a process pool; points without data are left out.
+
+    ``fetcher(lat, lon, start, end)`` replaces the Meteostat download (it then runs in-process).
+    """
+    locations = list(dict.fromkeys((float(lat), float(lon)) for lat, lon in locations))
+    tasks = [(lat, lon, start, end) for lat, lon in locations]
+    if fetcher is not None:
+        results = [fetcher(*task) for task in tasks]
+    else:
+        workers = workers or os.cpu_count() or 1
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_fetch_point, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+
+    rows = [normals for normals in results if normals is not None]
+    columns = {
+        "lat": np.array([n.lat for n in rows], dtype=np.float32),
+        "lon": np.array([n.lon for n in rows], dtype=np.float32),
+        "avg_temp": np.array([n.avg_temp for n in rows], dtype=np.float32),
+        "avg_annual_rainfall": np.array([n.avg_annual_rainfall for n in rows], dtype=np.float32),
+        "seasonal_rainfall": np.array([np.nan if n.seasonal_rainfall is None else n.seasonal_rainfall
+                                       for n in rows], dtype=np.float32),
+    }
+    for name in MONTHLY_COLUMNS:
+        columns[name] = np.array([getattr(n, name) or (np.nan,) * 12 for n in rows], dtype=np.float32).reshape(-1, 12)
+    meta = {"format": FORMAT_VERSION, "start": start.isoformat(), "end": end.isoformat(),
+            "radius_km": radius_km, "rows": len(rows), "requested": len(tasks),
+            "built_at": datetime.now().isoformat(timespec="seconds")}
+    return ClimateTable(columns, meta)
+
+
+def load_default_table(path=settings.CLIMATE_TABLE_DIR):
+    """The table at ``path`` if one was built there, else None."""
+    if not os.path.exists(os.path.join(path, "meta.json")):
+        return None
+    try:
+        return ClimateTable.load(path)
+    except (OSError, ValueError) as e:
+        logger.warning("Ignoring climate table at %s (rebuild it): %s", path, e)
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m rootpredict.climate_table",
+                                     description="Build or query the precomputed climate table.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    build = sub.add_parser("build", help="Fetch Meteostat data for a region and write the table")
+    source = build.add_mutually_exclusive_group(required=True)
+    source.add_argument("--bbox", nargs=4, type=float, metavar=("LAT_MIN", "LAT_MAX", "LON_MIN", "LON_MAX"))
+    source.add_argument("--locations", help="CSV file with 'lat' and 'lon' columns")
+    build.add_argument("--step", type=float, default=settings.CLIMATE_GRID_DEGREES, help="Grid step for --bbox (degrees)")
+    build.add_argument("--radius-km", type=float, default=25.0, help="Answer lookups only this close to a table point")
+    build.add_argument("--workers", type=int, default=None)
+    build.add_argument("--out", default=settings.CLIMATE_TABLE_DIR)
+
+    query = sub.add_parser("query", help="Look up the nearest table point")
+    query.add_argument("lat", type=float)
+    query.add_argument("lon", type=float)
+    query.add_argument("--table", default=settings.CLIMATE_TABLE_DIR)
+
+    args = parser.parse_args(argv)
+    if args.command == "build":
+        if args.bbox:
+            locations = grid_locations(*args.bbox, args.step)
+        else:
+            from rootpredict.climate import _read_locations
+
+            locations = _read_locations(args.locations)
+        started = time.perf_counter()
+        table = build_table(locations, radius_km=args.radius_km, workers=args.workers)
+        table.save(args.out)
+        print(json.dumps({**table.meta, "seconds": round(time.perf_counter() - started, 1), "out": args.out}))
+        return 0
+
+    table = load_default_table(args.table)
+    if table is None:
+        print(f"No climate table at {args.table}", file=sys.stderr)
+        return 1
+    index, distance_km = table.nearest(args.lat, args.lon)
+    normals = table.lookup(args.lat, args.lon, table.start, table.end)
+    print(json.dumps({"row": index, "distance_km": round(distance_km, 3),
+                      "covered": normals is not None,
+                      "normals": None if normals is None else normals.__dict__}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
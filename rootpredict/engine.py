@@ -0,0 +1,247 @@
+"""Headless prediction engine shared by the Streamlit page and the batch CLI.
+
+Everything needed to go from farm inputs to a yield prediction lives here:
+scenario offsets, feature assembly, the historical comparison and the
+resource scaling. The module never imports streamlit, so it can be used from
+scheduled jobs (see ``python -m rootpredict score --help``).
+"""
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from rootpredict import metrics
+from rootpredict.batch import score_plots
+from rootpredict.model_store import ModelBundle, ModelStore
+from rootpredict.registry import ModelRegistry, check_crop_label, get_registry
+from rootpredict.result_cache import PredictionCache, get_prediction_cache
+from rootpredict.uncertainty import DEFAULT_INTERVAL, YieldDistribution, jitter_climate, summarize_samples
+
+# Climate change scenarios: offset added to the baseline temperature and factor applied to rainfall
+SCENARIO_OPTIONS: Dict[str, Dict[str, float]] = {
+    "Baseline (Current Climate)": {"temp_offset": 0.0, "rainfall_factor": 1.0},
+    "Moderate Warming (+1.5°C)": {"temp_offset": 1.5, "rainfall_factor": 0.9}, # 10% less rain
+    "Severe Warming (+3.0°C)": {"temp_offset": 3.0, "rainfall_factor": 0.75} # 25% less rain
+}
+
+# Short names for the scenarios, used on the command line
+SCENARIO_KEYS: Dict[str, str] = dict(zip(["baseline", "moderate", "severe"], SCENARIO_OPTIONS))
+
+
+@dataclass(frozen=True)
+class ScenarioInputs:
+    """One farming scenario, in the units shown on the page's sliders."""
+    crop: str
+    N: float
+    P: float
+    K: float
+    temperature: float                     # Average seasonal temperature (°C)
+    humidity: float                        # Average seasonal humidity (%)
+    ph: float
+    rainfall: float                        # Seasonal rainfall (mm per month of the growing season)
+    average_rain_fall_mm_per_year: float
+    pesticides_tonnes: float               # Pesticides (tonnes/ha base)
+    land_area_ha: float = 1.0
+    avg_temp: Optional[float] = None       # Defaults to ``temperature``, as on the page
+
+    def feature_row(self) -> Dict[str, float]:
+        """Model input features for this scenario (the crop's one-hot label is the only one set)."""
+        return {
+            'N': self.N,
+            'P': self.P,
+            'K': self.K,
+            'temperature': self.temperature,
+            'humidity': self.humidity,
+            'ph': self.ph,
+            'rainfall': self.rainfall,
+            'average_rain_fall_mm_per_year': self.average_rain_fall_mm_per_year,
+            'pesticides_tonnes': self.pesticides_tonnes,
+            'avg_temp': self.temperature if self.avg_temp is None else self.avg_temp,
+            f'label_{self.crop}': 1,
+        }
+
+
+def feature_vector(row: Dict[str, float], model_features: List[str]) -> np.ndarray:
+    """``row`` in ``model_features`` order; one-hot crop labels absent from ``row`` are 0."""
+    return np.array([row.get(feature, 0) if feature.startswith('label_') else row[feature]
+                     for feature in model_features], dtype=np.float64)
+
+
+@dataclass(frozen=True)
+class ResourceNeeds:
+    """Estimated inputs for a land area, from the crop's historical per-hectare averages."""
+    nitrogen_kg: float
+    phosphorus_kg: float
+    potassium_kg: float
+    pesticides_tonnes: float
+
+
+@dataclass(frozen=True)
+class Prediction:
+    crop: str
+    land_area_ha: float
+    yield_per_ha: float
+    total_yield: float
+    historical_avg_yield_per_ha: float
+    vs_historical_pct: float               # Positive when above the historical average
+    resources: ResourceNeeds
+    model_version: str
+    tree_spread: YieldDistribution         # Per-tree predictions: interval and P(beat historical)
+
+
+# Model inputs a climate scenario changes: offsets are added to the temperatures, factors scale the rainfall
+TEMPERATURE_FEATURES = ('temperature', 'avg_temp')
+RAINFALL_FEATURES = ('rainfall', 'average_rain_fall_mm_per_year')
+
+
+def shift_climate(values, temp_offset=0.0, rainfall_factor=1.0):
+    """Copy of ``values`` with its temperature inputs shifted and its rainfall inputs (seasonal and annual) scaled.
+
+    ``values`` maps input names to scalars or arrays (a dict or a DataFrame); inputs it does not
+    have are skipped. The page, the sweep and the batch CLI all shift climate through this.
+    """
+    values = values.copy()
+    for name in TEMPERATURE_FEATURES:
+        if name in values:
+            values[name] = values[name] + temp_offset
+    for name in RAINFALL_FEATURES:
+        if name in values:
+            values[name] = values[name] * rainfall_factor
+    return values
+
+
+def apply_scenario(values, scenario_name: str):
+    """``values`` under a named scenario (see SCENARIO_OPTIONS and shift_climate)."""
+    return shift_climate(values, **SCENARIO_OPTIONS[scenario_name])
+
+
+def compare_to_history(crop: str, yield_per_ha: float, registry: Optional[ModelRegistry] = None) -> Tuple[float, float]:
+    """Return (historical average yield, % difference of ``yield_per_ha`` from it)."""
+    spec = (registry or get_registry()).crops.get(crop)
+    historical = spec.historical_yield if spec else 0
+    if not historical:
+        return historical, 0.0
+    return historical, (yield_per_ha - historical) / historical * 100
+
+
+def resource_needs(crop: str, land_area_ha: float, registry: Optional[ModelRegistry] = None) -> ResourceNeeds:
+    per_ha = (registry or get_registry()).crop(crop).inputs_per_ha
+    return ResourceNeeds(
+        nitrogen_kg=per_ha['N'] * land_area_ha,
+        phosphorus_kg=per_ha['P'] * land_area_ha,
+        potassium_kg=per_ha['K'] * land_area_ha,
+        pesticides_tonnes=per_ha['pesticides_tonnes'] * land_area_ha,
+    )
+
+
+class PredictionEngine:
+    """Scores scenarios with each crop's model from a ModelRegistry (the process-wide one by default).
+
+    Passing ``store`` scores every crop with that single model instead (benchmarks, experiments).
+    """
+
+    def __init__(self, store: Optional[ModelStore] = None, cache: Optional[PredictionCache] = None,
+                 registry: Optional[ModelRegistry] = None):
+        self.store = store
+        self.registry = registry or get_registry()
+        # Memoizes interactive predictions; pass a PredictionCache(max_entries=...) to resize
+        self.cache = cache or get_prediction_cache()
+
+    def model_id(self, crop: str) -> Optional[str]:
+        """Registry id of the model that scores ``crop`` (None when a fixed ``store`` is used)."""
+        model_id = self.registry.crop(crop).model_id
+        return None if self.store is not None else model_id
+
+    def bundle_for(self, crop: str) -> ModelBundle:
+        """The loaded model for ``crop`` (loads it on first use)."""
+        if self.model_id(crop) is not None:
+            return self.registry.bundle(crop)
+        bundle = self.store.get()
+        check_crop_label(crop, bundle.features)
+        return bundle
+
+    def predict_many(self, scenarios: Iterable[ScenarioInputs]) -> List[Prediction]:
+        scenarios = list(scenarios)
+        groups: Dict[Optional[str], List[int]] = {}
+        for i, scenario in enumerate(scenarios):
+            groups.setdefault(self.model_id(scenario.crop), []).append(i)
+
+        # Every crop is checked against its model before anything is scored
+        bundles = {crop: self.bundle_for(crop) for crop in dict.fromkeys(scenario.crop for scenario in scenarios)}
+
+        predictions: List[Optional[Prediction]] = [None] * len(scenarios)
+        for model_id, indices in groups.items():
+            group = [scenarios[i] for i in indices]
+            bundle = bundles[group[0].crop]
+            # One batched evaluation per model gives every tree's output; the forest prediction is their mean.
+            # Rows scored before (same quantized inputs, same model version) come from the cache.
+            with metrics.span("features.assemble"):
+                matrix = self.feature_matrix(group, bundle.features)
+            per_tree = self.cache.get_or_compute(bundle.version, matrix, bundle.features,
+                                                 self._predict_per_tree(bundle), model=model_id)
+            yields = per_tree.mean(axis=0)
+
+            for position, (i, scenario) in enumerate(zip(indices, group)):
+                yield_per_ha = float(yields[position])
+                historical, pct = compare_to_history(scenario.crop, yield_per_ha, self.registry)
+                predictions[i] = Prediction(
+                    crop=scenario.crop,
+                    land_area_ha=scenario.land_area_ha,
+                    yield_per_ha=yield_per_ha,
+                    total_yield=yield_per_ha * scenario.land_area_ha,
+                    historical_avg_yield_per_ha=historical,
+                    vs_historical_pct=pct,
+                    resources=resource_needs(scenario.crop, scenario.land_area_ha, self.registry),
+                    model_version=bundle.version,
+                    tree_spread=summarize_samples(per_tree[:, position], historical),
+                )
+        return predictions
+
+    @staticmethod
+    def _predict_per_tree(bundle):
+        def compute(matrix):
+            with metrics.span("model.predict"):
+                return bundle.predict_per_tree(matrix)
+        return compute
+
+    @staticmethod
+    def feature_matrix(scenarios: List[ScenarioInputs], model_features: List[str]) -> np.ndarray:
+        """Rows of model inputs, columns in ``model_features`` order."""
+        if not scenarios:
+            return np.empty((0, len(model_features)), dtype=np.float64)
+        return np.stack([feature_vector(scenario.feature_row(), model_features) for scenario in scenarios])
+
+    def predict(self, scenario: ScenarioInputs) -> Prediction:
+        return self.predict_many([scenario])[0]
+
+    def monte_carlo(self, scenario: ScenarioInputs, n_samples: int = 2000, temp_sd: float = 1.0,
+                    rainfall_cv: float = 0.15, humidity_sd: float = 5.0, seed: Optional[int] = None,
+                    interval: Tuple[float, float] = DEFAULT_INTERVAL) -> YieldDistribution:
+        """Yield distribution under random climate jitter around ``scenario``.
+
+        All samples are scored in one batched per-tree evaluation; the result pools every
+        tree's output for every sample, so it reflects both input and model uncertainty.
+        """
+        bundle = self.bundle_for(scenario.crop)
+        base_row = self.feature_matrix([scenario], bundle.features)[0]
+        samples = jitter_climate(base_row, bundle.features, n_samples, temp_sd, rainfall_cv, humidity_sd, seed)
+        historical, _ = compare_to_history(scenario.crop, 0.0, self.registry)
+        with metrics.span("monte_carlo.predict"):
+            per_tree = bundle.predict_per_tree(samples)
+        return summarize_samples(per_tree, historical, interval)
+
+    def score_frame(self, plots: pd.DataFrame, scenario_name: Optional[str] = None) -> pd.DataFrame:
+        """Score a table of plots (see rootpredict.batch.REQUIRED_COLUMNS), under ``scenario_name`` if given."""
+        adjust = None if scenario_name is None else (lambda valid: apply_scenario(valid, scenario_name))
+        return score_plots(plots, self.registry, self.bundle_for, adjust=adjust)
+
+
+_default_engine = None
+
+
+def get_engine() -> PredictionEngine:
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = PredictionEngine()
+    return _default_engine
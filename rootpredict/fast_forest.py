@@ -0,0 +1,159 @@
+"""Low-latency inference for the fitted RandomForest using flat NumPy arrays.
+
+For a single interactive prediction, scikit-learn spends more time on DataFrame
+handling, input validation and joblib dispatch than on walking 100 shallow
+trees. FlatForest copies every tree's node arrays into one contiguous block at
+load time and evaluates all trees for a batch of rows with a fixed number of
+vectorized steps (one per tree level), with no per-call Python loop over trees.
+
+Leaves are encoded as nodes that point to themselves, so rows that reach a leaf
+early simply stay there while deeper rows keep descending.
+
+scikit-learn compares float32 inputs with float64 thresholds. Each threshold is
+rounded down to the nearest float32 once at load time, which gives exactly the
+same decisions while letting the traversal stay in float32.
+"""
+import numpy as np
+
+# Rows traversed together; keeps the (trees x rows) working arrays cache-sized
+ROW_BLOCK = 1024
+
+
+def _float32_floor(values):
+    """Largest float32 <= each float64 value, so float32 ``x <= t32`` matches float64 ``x <= t``."""
+    rounded = values.astype(np.float32)
+    too_high = rounded.astype(np.float64) > values
+    rounded[too_high] = np.nextafter(rounded[too_high], np.float32(-np.inf))
+    return rounded
+
+
+class FlatForest:
+    def __init__(self, feature, threshold, left, right, value, roots, n_features, max_depth,
+                 threshold32=None, step=None):
+        self.feature = feature        # int32, split feature per node (0 for leaves)
+        self.threshold = threshold    # float64, split threshold (+inf for leaves)
+        self.left = left              # int32, absolute index of the left child (self for leaves)
+        self.right = right            # int32, absolute index of the right child (self for leaves)
+        self.value = value            # float64, node prediction (only read at leaves)
+        self.roots = roots            # int32, index of each tree's root node
+        self.n_features = int(n_features)
+        self.max_depth = int(max_depth)
+        # Traversal-ready views: pointer-sized indices, float32 thresholds, right = left + step.
+        # Arrays that already have these dtypes (e.g. memory-mapped from a model artifact) are used as-is.
+        self._feature = feature.astype(np.intp, copy=False)
+        self._threshold32 = _float32_floor(threshold) if threshold32 is None else threshold32
+        self._left = left.astype(np.intp, copy=False)
+        self._step = right.astype(np.intp) - self._left if step is None else step.astype(np.intp, copy=False)
+        self._roots = roots.astype(np.intp, copy=False)
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @classmethod
+    def from_sklearn(cls, forest):
+        """Flatten a fitted single-output RandomForestRegressor (or any forest of regression trees)."""
+        trees = [estimator.tree_ for estimator in forest.estimators_]
+        if any(tree.n_outputs != 1 for tree in trees):
+            raise ValueError("FlatForest supports single-output regression forests only")
+
+        sizes = np.array([tree.node_count for tree in trees])
+        offsets = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int32)
+        total = int(sizes.sum())
+        feature = np.empty(total, dtype=np.int32)
+        threshold = np.empty(total, dtype=np.float64)
+        left = np.empty(total, dtype=np.int32)
+        right = np.empty(total, dtype=np.int32)
+        value = np.empty(total, dtype=np.float64)
+
+        for tree, offset, size in zip(trees, offsets, sizes):
+            nodes = slice(offset, offset + size)
+            own_index = np.arange(offset, offset + size, dtype=np.int32)
+            is_leaf = tree.children_left == -1
+            feature[nodes] = np.where(is_leaf, 0, tree.feature)
+            threshold[nodes] = np.where(is_leaf, np.inf, tree.threshold)
+            left[nodes] = np.where(is_leaf, own_index, tree.children_left + offset)
+            right[nodes] = np.where(is_leaf, own_index, tree.children_right + offset)
+            value[nodes] = tree.value[:, 0, 0]
+
+        return cls(feature, threshold, left, right, value, offsets,
+                   n_features=forest.n_features_in_, max_depth=max(tree.max_depth for tree in trees))
+
+    def _as_matrix(self, X):
+        # scikit-learn's trees also see the inputs as float32
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        return X
+
+    def _block_leaves(self, block):
+        """Absolute leaf node index for every (tree, row) of one row block, tree-major and flat."""
+        size = block.shape[0]
+        flat_x = block.ravel()
+        # Position of each (tree, row) pair's row within flat_x, tree-major
+        row_offset = np.tile(np.arange(size, dtype=np.intp) * self.n_features, self.n_trees)
+        node = np.repeat(self._roots, size)
+        for _ in range(self.max_depth):
+            go_right = flat_x.take(row_offset + self._feature.take(node)) > self._threshold32.take(node)
+            node = self._left.take(node) + self._step.take(node) * go_right
+        return node
+
+    @staticmethod
+    def _blocks(X):
+        for start in range(0, X.shape[0], ROW_BLOCK):
+            yield start, np.ascontiguousarray(X[start:start + ROW_BLOCK])
+
+    def leaf_indices(self, X):
+        """Absolute leaf node index for every (tree, row): shape (n_trees, n_rows)."""
+        X = self._as_matrix(X)
+        leaves = np.empty((self.n_trees, X.shape[0]), dtype=np.intp)
+        for start, block in self._blocks(X):
+            leaves[:, start:start + len(block)] = self._block_leaves(block).reshape(self.n_trees, len(block))
+        return leaves
+
+    def predict_per_tree(self, X):
+        """Each tree's prediction for each row: shape (n_trees, n_rows)."""
+        return self.value.take(self.leaf_indices(X))
+
+    def predict(self, X):
+        """Forest prediction (mean over trees), same as RandomForestRegressor.predict.
+
+        Trees are averaged block by block, so memory stays at one row block's
+        (trees x rows) arrays however large the batch is.
+        """
+        X = self._as_matrix(X)
+        predictions = np.empty(X.shape[0], dtype=np.float64)
+        for start, block in self._blocks(X):
+            values = self.value.take(self._block_leaves(block)).reshape(self.n_trees, len(block))
+            predictions[start:start + len(block)] = values.sum(axis=0) / self.n_trees
+        return predictions
+
+    def traversal_arrays(self):
+        """Every array the forest needs, in traversal dtypes (what a model artifact stores)."""
+        return {"feature": self._feature, "threshold": self.threshold, "threshold32": self._threshold32,
+                "left": self._left, "right": self.right.astype(np.intp, copy=False), "step": self._step,
+                "value": self.value, "roots": self._roots}
+
+    def nbytes(self):
+        return sum(a.nbytes for a in (self.feature, self.threshold, self.left, self.right, self.value, self.roots))
+
+
+def parity_sample(flat, n_rows=256, seed=0):
+    """Random rows spanning every feature's split range, for comparing backends."""
+    rng = np.random.default_rng(seed)
+    is_split = np.isfinite(flat.threshold)
+    low = np.zeros(flat.n_features)
+    high = np.ones(flat.n_features)
+    for j in range(flat.n_features):
+        cuts = flat.threshold[is_split & (flat.feature == j)]
+        if len(cuts):
+            margin = max(1.0, 0.1 * (cuts.max() - cuts.min()))
+            low[j], high[j] = cuts.min() - margin, cuts.max() + margin
+    return rng.uniform(low, high, size=(n_rows, flat.n_features))
+
+
+def max_parity_error(flat, reference_predict, X):
+    """Largest absolute difference between FlatForest and a reference predict function on X."""
+    return float(np.max(np.abs(flat.predict(X) - np.asarray(reference_predict(X)))))
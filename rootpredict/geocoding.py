@@ -0,0 +1,171 @@
+"""City-name geocoding through OpenWeather, cached in memory and on disk.
+
+Both the current-weather and the climate-averages flows need the coordinates of
+the same city. This module is the single place that asks OpenWeather for them:
+results are kept in a per-process LRU and in a small SQLite file so repeat
+lookups (across sessions, users and server restarts) never leave the machine.
+"""
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+
+from rootpredict import metrics, settings
+from rootpredict.http_client import get_http_client
+from rootpredict.lru import LRUCache
+
+
+@dataclass(frozen=True)
+class GeoLocation:
+    name: str      # Name as returned by OpenWeather (usually better cased than the user's input)
+    lat: float
+    lon: float
+    country: str = ""
+
+
+def normalize_city_name(city_name):
+    """Canonical cache key for a user-typed city name ("  new   YORK " -> "new york")."""
+    text = unicodedata.normalize("NFKC", city_name or "")
+    return " ".join(text.split()).casefold()
+
+
+class _GeocodeDiskStore:
+    """SQLite-backed persistence for geocoding results."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connection(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS geocode ("
+                " query TEXT PRIMARY KEY, name TEXT NOT NULL, lat REAL NOT NULL,"
+                " lon REAL NOT NULL, country TEXT NOT NULL, fetched_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def get(self, query, max_age_seconds):
+        with self._lock:
+            row = self._connection().execute(
+                "SELECT name, lat, lon, country, fetched_at FROM geocode WHERE query = ?", (query,)
+            ).fetchone()
+        if row is None or time.time() - row[4] > max_age_seconds:
+            return None
+        return GeoLocation(name=row[0], lat=row[1], lon=row[2], country=row[3])
+
+    def put(self, query, location):
+        with self._lock:
+            conn = self._connection()
+            conn.execute(
+                "INSERT OR REPLACE INTO geocode (query, name, lat, lon, country, fetched_at)"
+                " VALUES (?, ?, ?, ?, ?, ?)",
+                (query, location.name, location.lat, location.lon, location.country, time.time()),
+            )
+            conn.commit()
+
+    def clear(self):
+        with self._lock:
+            conn = self._connection()
+            conn.execute("DELETE FROM geocode")
+            conn.commit()
+
+
+class GeocodingService:
+    """Resolve city names to coordinates: memory LRU -> SQLite -> OpenWeather."""
+
+    def __init__(self, api_key, db_path=settings.GEOCODE_DB_PATH, max_entries=1024,
+                 ttl_seconds=24 * 3600, disk_ttl_seconds=90 * 24 * 3600, http_get=None):
+        self.api_key = api_key
+        self.disk_ttl_seconds = disk_ttl_seconds
+        self._memory = LRUCache(max_entries=max_entries, ttl_seconds=ttl_seconds)
+        self._disk = _GeocodeDiskStore(db_path) if db_path else None
+        self._http_get = http_get or get_http_client().get
+        self._counter_lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def lookup(self, city_name):
+        """Return a GeoLocation for ``city_name`` or None if OpenWeather does not know it.
+
+        Network failures (requests exceptions) propagate to the caller.
+        """
+        query = normalize_city_name(city_name)
+        if not query:
+            return None
+
+        with metrics.span("geocode"):
+            location = self._memory.get(query)
+            if location is not None:
+                self._count("memory_hits")
+                metrics.cache_result("geocode", "memory_hit")
+                return location
+
+            if self._disk is not None:
+                location = self._disk.get(query, self.disk_ttl_seconds)
+                if location is not None:
+                    self._count("disk_hits")
+                    metrics.cache_result("geocode", "disk_hit")
+                    self._memory.put(query, location)
+                    return location
+
+            self._count("misses")
+            metrics.cache_result("geocode", "miss")
+            location = self._fetch(query)
+            if location is not None:
+                self._memory.put(query, location)
+                if self._disk is not None:
+                    self._disk.put(query, location)
+            return location
+
+    def _fetch(self, query):
+        with metrics.span("openweather.geocode"):
+            response = self._http_get(
+                settings.OPENWEATHER_GEOCODE_URL,
+                params={"q": query, "limit": 1, "appid": self.api_key},
+            )
+        if response.status_code != 200:
+            return None
+        geo_data = response.json()
+        if not geo_data:
+            return None
+        first = geo_data[0]
+        return GeoLocation(name=first["name"], lat=first["lat"], lon=first["lon"],
+                           country=first.get("country", ""))
+
+    def _count(self, counter):
+        with self._counter_lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "memory": self._memory.stats(),
+        }
+
+    def clear(self):
+        self._memory.clear()
+        if self._disk is not None:
+            self._disk.clear()
+
+
+# Shared by every session in this server process (one per API key)
+_services = {}
+_services_lock = threading.Lock()
+
+
+def get_geocoding_service(api_key):
+    with _services_lock:
+        service = _services.get(api_key)
+        if service is None:
+            service = _services[api_key] = GeocodingService(api_key)
+        return service
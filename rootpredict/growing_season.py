@@ -0,0 +1,58 @@
+"""Crop-specific growing-season climate features from a monthly climatology.
+
+The model's ``temperature``, ``humidity`` and ``rainfall`` inputs describe the
+growing season, not the whole year. Given the Jan..Dec climatology stored on
+ClimateNormals, every possible season start is evaluated at once as a (12,
+months) window matrix; the crop's season is the wettest window, and the
+temperature, humidity and rainfall averaged over it become the slider defaults.
+"""
+import calendar
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+from rootpredict.climate import ClimateNormals, season_windows
+from rootpredict.registry import get_registry
+
+# Season length for crops without an entry in the manifest
+DEFAULT_SEASON_MONTHS = 4
+
+
+@dataclass(frozen=True)
+class GrowingSeason:
+    crop: str
+    start_month: int                # 1 = January
+    months: int
+    temperature: float              # Mean monthly temperature over the season (°C)
+    rainfall: float                 # Mean monthly rainfall over the season (mm), the scale of the model's 'rainfall'
+    humidity: Optional[float]       # Mean relative humidity (%), None when the source has none
+
+    @property
+    def label(self) -> str:
+        """Season as month abbreviations, e.g. 'Nov–Mar'."""
+        end_month = (self.start_month + self.months - 2) % 12 + 1
+        return f"{calendar.month_abbr[self.start_month]}–{calendar.month_abbr[end_month]}"
+
+
+def growing_season(normals: ClimateNormals, crop: str, months: Optional[int] = None) -> Optional[GrowingSeason]:
+    """Growing-season features for ``crop``; None if ``normals`` carries no monthly climatology."""
+    if normals is None or normals.monthly_temp is None or normals.monthly_rainfall is None:
+        return None
+    if not months:
+        spec = get_registry().crops.get(crop)
+        months = spec.growing_season_months if spec else DEFAULT_SEASON_MONTHS
+    rainfall = season_windows(normals.monthly_rainfall, months).mean(axis=1)
+    start = int(np.argmax(rainfall))
+    temperature = season_windows(normals.monthly_temp, months).mean(axis=1)[start]
+    humidity = None
+    if normals.monthly_humidity is not None:
+        humidity = float(season_windows(normals.monthly_humidity, months).mean(axis=1)[start])
+    return GrowingSeason(crop=crop, start_month=start + 1, months=months, temperature=float(temperature),
+                         rainfall=float(rainfall[start]), humidity=humidity)
+
+
+def growing_seasons(normals: ClimateNormals) -> Dict[str, GrowingSeason]:
+    """growing_season for every crop in the registry (empty without monthly data)."""
+    seasons = {crop: growing_season(normals, crop) for crop in get_registry().crops}
+    return {crop: season for crop, season in seasons.items() if season is not None}
@@ -0,0 +1,132 @@
+"""Shared HTTP client: pooled connections, bounded timeouts, jittered retries.
+
+A bare ``requests.get`` opens a fresh TCP/TLS connection and can wait forever on
+a slow server. Every outbound call goes through one process-wide HttpClient
+instead, which keeps connections alive per host, caps each attempt with a
+(connect, read) timeout, retries transient failures with full-jitter
+exponential backoff and records per-request latency so tail latency can be
+inspected. ``run_concurrently`` runs independent calls on a shared thread pool.
+"""
+import contextvars
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rootpredict import settings
+
+# Status codes worth another attempt; anything else is returned to the caller as-is
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class HttpClient:
+    def __init__(self, pool_size=16, timeout=(settings.HTTP_CONNECT_TIMEOUT, settings.HTTP_READ_TIMEOUT),
+                 max_retries=settings.HTTP_MAX_RETRIES, backoff_base=0.25, backoff_max=2.0,
+                 latency_window=1000, session=None, sleep=time.sleep):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._sleep = sleep
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+        self.session = session
+        self._latencies = {}  # host -> deque of seconds for the most recent requests
+        self._latency_window = latency_window
+        self._stats_lock = threading.Lock()
+        self.retries = 0
+        self.failures = 0
+
+    def backoff_delay(self, attempt):
+        """Full-jitter backoff: uniform in [0, min(cap, base * 2**attempt)]."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def get(self, url, params=None, timeout=None):
+        """GET with retries on connection errors, timeouts and RETRY_STATUSES.
+
+        After the last attempt a retryable response is returned as-is and a network
+        exception is re-raised, so callers keep their usual status/exception handling.
+        """
+        host = urlsplit(url).netloc
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=timeout or self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout):
+                self._record(host, time.perf_counter() - start)
+                if attempt >= self.max_retries:
+                    with self._stats_lock:
+                        self.failures += 1
+                    raise
+            else:
+                self._record(host, time.perf_counter() - start)
+                if response.status_code not in RETRY_STATUSES or attempt >= self.max_retries:
+                    return response
+            with self._stats_lock:
+                self.retries += 1
+            self._sleep(self.backoff_delay(attempt))
+            attempt += 1
+
+    def _record(self, host, seconds):
+        with self._stats_lock:
+            samples = self._latencies.get(host)
+            if samples is None:
+                samples = self._latencies[host] = deque(maxlen=self._latency_window)
+            samples.append(seconds)
+
+    def latency_stats(self):
+        """Per-host request counts and p50/p95/p99/max latency (seconds) over the recent window."""
+        with self._stats_lock:
+            snapshot = {host: sorted(samples) for host, samples in self._latencies.items()}
+            retries, failures = self.retries, self.failures
+        hosts = {}
+        for host, samples in snapshot.items():
+            def pct(q):
+                return samples[min(len(samples) - 1, int(q * len(samples)))]
+            hosts[host] = {"count": len(samples), "p50": pct(0.50), "p95": pct(0.95),
+                           "p99": pct(0.99), "max": samples[-1]}
+        return {"hosts": hosts, "retries": retries, "failures": failures}
+
+
+# Shared by all sessions: one connection pool and one worker pool per server process
+_client = None
+_executor = None
+_init_lock = threading.Lock()
+
+
+def get_http_client():
+    global _client
+    with _init_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def get_executor():
+    global _executor
+    with _init_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rootpredict-io")
+        return _executor
+
+
+def run_concurrently(calls, timeout=None):
+    """Run zero-argument callables in parallel and return their futures in order.
+
+    Waits at most ``timeout`` seconds overall; futures still running after that are
+    returned unfinished (``future.done()`` is False) so the caller can report them.
+    Each call runs in a copy of the caller's context, so its metrics spans reach the
+    caller's page trace.
+    """
+    futures = [get_executor().submit(contextvars.copy_context().run, call) for call in calls]
+    wait(futures, timeout=timeout)
+    return futures
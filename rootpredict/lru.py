@@ -0,0 +1,96 @@
+"""A small thread-safe LRU cache with optional time-to-live, size budget and hit/miss counters."""
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry when full.
+
+    Entries older than ``ttl_seconds`` (if given) are treated as misses and dropped.
+    With ``max_weight``, entries are also evicted while the summed ``weight`` passed to
+    ``put`` (e.g. bytes) exceeds it; the newest entry is always kept.
+    Safe to share between the threads Streamlit uses for concurrent sessions.
+    """
+
+    def __init__(self, max_entries=1024, ttl_seconds=None, clock=time.monotonic, max_weight=None):
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_weight = max_weight
+        self._clock = clock
+        self._data = OrderedDict()  # key -> (stored_at, value)
+        self._weights = {}  # key -> weight given to put
+        self.total_weight = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            stored_at, value = entry
+            if self.ttl_seconds is not None and self._clock() - stored_at > self.ttl_seconds:
+                del self._data[key]
+                self.total_weight -= self._weights.pop(key, 0)
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value, weight=0):
+        with self._lock:
+            self._data[key] = (self._clock(), value)
+            self._data.move_to_end(key)
+            self.total_weight += weight - self._weights.get(key, 0)
+            self._weights[key] = weight
+            while len(self._data) > self.max_entries or (
+                    self.max_weight is not None and self.total_weight > self.max_weight and len(self._data) > 1):
+                evicted, _ = self._data.popitem(last=False)
+                self.total_weight -= self._weights.pop(evicted, 0)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._data.pop(key, _MISSING)
+            if entry is _MISSING:
+                return default
+            self.total_weight -= self._weights.pop(key, 0)
+            return entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._weights.clear()
+            self.total_weight = 0
+
+    def keys(self):
+        """Current keys, least recently used first (does not count as access)."""
+        with self._lock:
+            return list(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "total_weight": self.total_weight,
+                "max_weight": self.max_weight,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -0,0 +1,349 @@
+"""Per-stage timing spans, counters and their export surfaces.
+
+Wrap a stage in ``with metrics.span("openweather.weather"):`` and its latency
+lands in a fixed-bucket histogram, an exception in an error counter, and (when
+enabled) one JSON log line on the ``rootpredict.metrics`` logger. Cache lookups
+report with ``metrics.cache_result("geocode", "memory_hit")``. Enabling metrics
+sends that logger's INFO lines to stderr (unless it already has a handler) and
+logs a summary of every stage and counter each ROOTPREDICT_METRICS_LOG_INTERVAL
+seconds.
+
+Recording is off unless ROOTPREDICT_METRICS=1 (or ROOTPREDICT_METRICS_PORT is
+set, which also serves ``/metrics`` in Prometheus text format). While off,
+``span`` returns a shared no-op object after a flag check and a context-variable
+read, so instrumented code costs well under a microsecond per stage.
+
+Independently of the process-wide switch, ``begin_trace`` collects the spans of
+one page run (including work handed to the I/O pool by ``run_concurrently``)
+for the app's debug panel until ``end_trace``; ``traced`` does the same for one
+part of the page, such as a fragment that can rerun on its own.
+"""
+import bisect
+import contextlib
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rootpredict import settings
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket upper bounds in seconds (+Inf is implicit)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_enabled = settings.METRICS_ENABLED
+_trace = contextvars.ContextVar("rootpredict_trace", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket latency histogram (Prometheus semantics)."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile (None when empty)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+class Registry:
+    """Thread-safe store of stage histograms and labelled counters."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}  # stage -> Histogram
+        self._counters = {}    # (name, (label, value) pairs) -> int
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def increment(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def snapshot(self):
+        """Plain-dict copy: {"stages": {stage: {...}}, "counters": [(name, labels, value)]}."""
+        with self._lock:
+            stages = {}
+            for stage, h in self._histograms.items():
+                stages[stage] = {"count": h.count, "sum_seconds": h.sum,
+                                 "p50_le": h.quantile(0.5), "p95_le": h.quantile(0.95),
+                                 "p99_le": h.quantile(0.99), "buckets": list(h.counts)}
+            counters = [(name, dict(labels), value) for (name, labels), value in self._counters.items()]
+        return {"stages": stages, "counters": counters}
+
+    def render_prometheus(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = ["# HELP rootpredict_stage_seconds Latency of instrumented stages.",
+                 "# TYPE rootpredict_stage_seconds histogram"]
+        with self._lock:
+            for stage, h in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, count in zip(h.buckets + (float("inf"),), h.counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f'rootpredict_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                lines.append(f'rootpredict_stage_seconds_sum{{stage="{stage}"}} {h.sum!r}')
+                lines.append(f'rootpredict_stage_seconds_count{{stage="{stage}"}} {h.count}')
+            by_name = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                by_name.setdefault(name, []).append((labels, value))
+        for name, series in by_name.items():
+            lines.append(f"# TYPE rootpredict_{name} counter")
+            for labels, value in series:
+                rendered = ",".join(f'{key}="{_escape(val)}"' for key, val in labels)
+                lines.append(f"rootpredict_{name}{{{rendered}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def clear(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class Trace:
+    """Spans and cache events recorded during one page run."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.finished = False  # Set by end_trace once the run is over
+        self.spans = []  # (stage, start offset s, duration s, error type or None), in completion order
+        self.cache_events = Counter()  # (cache, result) -> count
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def rows(self):
+        """Spans ordered by start time, as dicts for a table."""
+        return [{"stage": stage, "start_ms": round(offset * 1e3, 2), "duration_ms": round(seconds * 1e3, 2),
+                 "status": error or "ok"}
+                for stage, offset, seconds, error in sorted(self.spans, key=lambda span: span[1])]
+
+
+_registry = Registry()
+
+
+class _Span:
+    __slots__ = ("stage", "trace", "start")
+
+    def __init__(self, stage, trace):
+        self.stage = stage
+        self.trace = trace
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        seconds = time.perf_counter() - self.start
+        error = exc_type.__name__ if exc_type is not None else None
+        if self.trace is not None:
+            self.trace.spans.append((self.stage, self.start - self.trace.started, seconds, error))
+        if _enabled:
+            _registry.observe(self.stage, seconds)
+            if error is not None:
+                _registry.increment("stage_errors_total", stage=self.stage, error=error)
+            if logger.isEnabledFor(logging.INFO):
+                logger.info(json.dumps({"event": "span", "stage": self.stage,
+                                        "ms": round(seconds * 1e3, 3), "status": error or "ok"}))
+        return False
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def span(stage):
+    """Context manager timing ``stage``; free when metrics are off and no trace is active."""
+    trace = _trace.get()
+    if not _enabled and trace is None:
+        return _NOOP_SPAN
+    return _Span(stage, trace)
+
+
+def cache_result(cache, result, count=1):
+    """Count ``count`` cache lookups with one outcome (e.g. "hit", "miss", "disk_hit")."""
+    if not count:
+        return
+    trace = _trace.get()
+    if trace is not None:
+        trace.cache_events[(cache, result)] += count
+    if _enabled:
+        _registry.increment("cache_requests_total", count, cache=cache, result=result)
+
+
+def begin_trace(active=True):
+    """Start collecting this context's spans (or stop, with ``active=False``); returns the Trace or None."""
+    trace = Trace() if active else None
+    _trace.set(trace)
+    return trace
+
+
+def end_trace():
+    """Finish this context's trace (call at the end of a page run); returns it or None.
+
+    Streamlit reruns a fragment on its own in the same thread, so without this the last
+    full run's trace would stay current and collect the fragment's spans where nobody sees them.
+    """
+    trace = _trace.get()
+    if trace is not None:
+        trace.finished = True
+    _trace.set(None)
+    return trace
+
+
+@contextlib.contextmanager
+def traced(active=True):
+    """Collect spans in a nested Trace for the block; they are also added to the enclosing trace.
+
+    A finished enclosing trace (from a run that is already over) is left alone.
+    """
+    parent = _trace.get()
+    if parent is not None and parent.finished:
+        parent = None
+    trace = Trace() if active else None
+    token = _trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _trace.reset(token)
+        if trace is not None and parent is not None:
+            shift = trace.started - parent.started
+            parent.spans.extend((stage, offset + shift, seconds, error) for stage, offset, seconds, error in trace.spans)
+            parent.cache_events.update(trace.cache_events)
+
+
+def enable():
+    global _enabled
+    _enabled = True
+    _start_logging()
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def get_registry():
+    return _registry
+
+
+def render_prometheus():
+    return _registry.render_prometheus()
+
+
+def log_snapshot():
+    """Emit every stage histogram and counter as one JSON log line each."""
+    snapshot = _registry.snapshot()
+    for stage, stats in snapshot["stages"].items():
+        logger.info(json.dumps({"event": "stage_summary", "stage": stage,
+                                **{k: v for k, v in stats.items() if k != "buckets"}}))
+    for name, labels, value in snapshot["counters"]:
+        logger.info(json.dumps({"event": "counter", "name": name, "labels": labels, "value": value}))
+
+
+_logging_started = False
+_logging_lock = threading.Lock()
+
+
+def _start_logging(interval_seconds=settings.METRICS_LOG_INTERVAL_SECONDS):
+    """Route the span lines to stderr and log a snapshot every ``interval_seconds`` (once per process)."""
+    global _logging_started
+    with _logging_lock:
+        if _logging_started:
+            return
+        _logging_started = True
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        logger.addHandler(handler)
+        logger.propagate = False  # One copy of each line even when the root logger also prints
+    logger.setLevel(logging.INFO)
+    if interval_seconds > 0:
+        def log_periodically():
+            while True:
+                time.sleep(interval_seconds)
+                if _enabled:
+                    log_snapshot()
+
+        threading.Thread(target=log_periodically, daemon=True, name="rootpredict-metrics-log").start()
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def serve(port=settings.METRICS_PORT, host="0.0.0.0"):
+    """Serve ``/metrics`` on ``port`` from a daemon thread (once per process); enables recording."""
+    global _server
+    with _server_lock:
+        if _server is not None:
+            return _server
+        enable()
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = render_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        _server = ThreadingHTTPServer((host, port), Handler)
+        _server.daemon_threads = True
+        threading.Thread(target=_server.serve_forever, daemon=True, name="rootpredict-metrics").start()
+        return _server
+
+
+if _enabled:
+    _start_logging()
@@ -0,0 +1,184 @@
+"""Compact, memory-mappable model artifact for the flat inference backend.
+
+``crop_yield_model.pkl`` has to be unpickled by every server process, which
+pulls in joblib and scikit-learn, keeps a private copy of the forest per
+process and executes whatever the pickle contains. The export tool converts
+the fitted forest and ``model_features`` into one binary file instead::
+
+    offset 0   b"RPFOREST"                      magic
+           8   uint32 little-endian             format version
+          12   uint32 little-endian             header length in bytes
+          16   JSON header                      features, forest shape, array table, source version
+           …   raw little-endian arrays         each starting on a 64-byte boundary
+
+Loading reads the header and maps the file once with ``numpy.memmap``; the
+arrays are views into that mapping in the dtypes FlatForest traverses with, so
+the OS shares the pages between processes and nothing is copied or executed.
+The header records the content hash of the pickles it was exported from; the
+model store uses that as the model version and falls back to the pickles when
+they no longer match.
+
+Export (checks parity with the pickle before replacing the artifact) and verify::
+
+    python -m rootpredict.model_artifact export
+    python -m rootpredict.model_artifact verify
+"""
+import argparse
+import json
+import os
+import struct
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from rootpredict import settings
+from rootpredict.fast_forest import FlatForest, max_parity_error, parity_sample
+
+MAGIC = b"RPFOREST"
+FORMAT_VERSION = 1
+ALIGNMENT = 64
+_PREFIX = struct.Struct("<8sII")  # magic, format version, header length
+
+# Stored dtype per FlatForest array (fixed width and byte order, so files are portable)
+ARRAY_DTYPES = {
+    "feature": "<i8", "threshold": "<f8", "threshold32": "<f4", "left": "<i8",
+    "right": "<i8", "step": "<i8", "value": "<f8", "roots": "<i8",
+}
+# Largest prediction difference against the pickle that export accepts
+PARITY_TOLERANCE = 1e-6
+
+
+def _align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def read_header(path):
+    """The artifact's JSON header (raises ValueError if ``path`` is not a supported artifact)."""
+    with open(path, "rb") as fh:
+        prefix = fh.read(_PREFIX.size)
+        if len(prefix) != _PREFIX.size:
+            raise ValueError(f"{path}: truncated model artifact")
+        magic, version, header_length = _PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError(f"{path}: not a RootPredict model artifact")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"{path}: unsupported model artifact format {version}")
+        header = json.loads(fh.read(header_length).decode("utf-8"))
+    header["data_offset"] = _align(_PREFIX.size + header_length)
+    return header
+
+
+def write_artifact(path, flat, features, source_version):
+    """Write ``flat`` and ``features`` to ``path`` atomically (processes mapping the old file keep it)."""
+    arrays = {name: np.ascontiguousarray(array, dtype=ARRAY_DTYPES[name])
+              for name, array in flat.traversal_arrays().items()}
+    table, offset = {}, 0
+    for name, array in arrays.items():
+        table[name] = {"dtype": ARRAY_DTYPES[name], "shape": list(array.shape), "offset": offset}
+        offset = _align(offset + array.nbytes)
+    header = json.dumps({
+        "features": list(features), "n_features": flat.n_features, "max_depth": flat.max_depth,
+        "n_trees": flat.n_trees, "n_nodes": int(len(flat.value)), "arrays": table,
+        "source_version": source_version, "exported_at": datetime.now().isoformat(timespec="seconds"),
+    }).encode("utf-8")
+    data_offset = _align(_PREFIX.size + len(header))
+
+    staging = path + ".tmp"
+    with open(staging, "wb") as fh:
+        fh.write(_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)))
+        fh.write(header)
+        for name, array in arrays.items():
+            fh.seek(data_offset + table[name]["offset"])
+            fh.write(array.tobytes())
+        fh.truncate(data_offset + offset)
+    os.replace(staging, path)
+
+
+def load_artifact(path):
+    """(FlatForest backed by a read-only memory map, feature names, header)."""
+    header = read_header(path)
+    buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    arrays = {}
+    for name, spec in header["arrays"].items():
+        dtype = np.dtype(spec["dtype"])
+        start = header["data_offset"] + spec["offset"]
+        count = int(np.prod(spec["shape"]))
+        if start + count * dtype.itemsize > buffer.size:
+            raise ValueError(f"{path}: truncated model artifact ({name})")
+        arrays[name] = buffer[start:start + count * dtype.itemsize].view(dtype).reshape(spec["shape"])
+    flat = FlatForest(arrays["feature"], arrays["threshold"], arrays["left"], arrays["right"], arrays["value"],
+                      arrays["roots"], n_features=header["n_features"], max_depth=header["max_depth"],
+                      threshold32=arrays["threshold32"], step=arrays["step"])
+    return flat, list(header["features"]), header
+
+
+def _load_pickles(model_path, features_path):
+    import joblib
+
+    return joblib.load(model_path), list(joblib.load(features_path))
+
+
+def parity_error(flat, model, features, n_rows=4096):
+    """Largest prediction difference between ``flat`` and the scikit-learn ``model``."""
+    import pandas as pd
+
+    sample = parity_sample(flat, n_rows=n_rows)
+    return max_parity_error(flat, lambda X: model.predict(pd.DataFrame(X, columns=features)), sample)
+
+
+def export_artifact(model_path=settings.MODEL_PATH, features_path=settings.FEATURES_PATH,
+                    out_path=settings.MODEL_ARTIFACT_PATH):
+    """Convert the pickled model to an artifact at ``out_path``; returns its header.
+
+    The artifact is written next to ``out_path``, loaded back through the memory-map path and
+    compared with the pickle's predictions; ``out_path`` is only replaced if they agree.
+    """
+    from rootpredict.model_store import _content_hash
+
+    model, features = _load_pickles(model_path, features_path)
+    flat = FlatForest.from_sklearn(model)
+    staging = out_path + ".export"
+    write_artifact(staging, flat, features, _content_hash(model_path, features_path))
+    try:
+        loaded, loaded_features, header = load_artifact(staging)
+        error = parity_error(loaded, model, features)
+        if loaded_features != features or error > PARITY_TOLERANCE:
+            raise ValueError(f"Exported model disagrees with {model_path} (max error {error:.3g}); not written")
+        del loaded  # Release the mapping before the file is renamed
+    except BaseException:
+        os.remove(staging)
+        raise
+    os.replace(staging, out_path)
+    return {**header, "max_parity_error": error}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m rootpredict.model_artifact",
+                                     description="Export or verify the memory-mappable model artifact.")
+    parser.add_argument("command", choices=["export", "verify"])
+    parser.add_argument("--model", default=settings.MODEL_PATH)
+    parser.add_argument("--features", default=settings.FEATURES_PATH)
+    parser.add_argument("--artifact", default=settings.MODEL_ARTIFACT_PATH)
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        header = export_artifact(args.model, args.features, args.artifact)
+        print(json.dumps({key: header[key] for key in ("source_version", "n_trees", "n_nodes", "max_parity_error")}
+                         | {"out": args.artifact, "bytes": os.path.getsize(args.artifact)}))
+        return 0
+
+    from rootpredict.model_store import _content_hash
+
+    flat, features, header = load_artifact(args.artifact)
+    model, pickle_features = _load_pickles(args.model, args.features)
+    error = parity_error(flat, model, pickle_features)
+    current = header["source_version"] == _content_hash(args.model, args.features)
+    ok = features == pickle_features and error <= PARITY_TOLERANCE
+    print(json.dumps({"source_version": header["source_version"], "matches_pickle_version": current,
+                      "max_parity_error": error, "ok": ok}))
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
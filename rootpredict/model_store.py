@@ -0,0 +1,217 @@
+"""Process-wide cache for a trained yield model.
+
+Streamlit re-executes app.py on every interaction, but imported modules stay in
+``sys.modules`` for the lifetime of the server process. Holding the loaded model
+here means it is unpickled once per process and shared by every session and
+rerun instead of being reloaded on each slider drag. The crop registry
+(rootpredict/registry.py) keeps one ModelStore per model in its manifest.
+
+With the flat backend, a memory-mapped model artifact (rootpredict/model_artifact.py)
+is preferred over the pickles when one exported from the current pickles exists:
+it loads without scikit-learn and its pages are shared by every server process.
+An artifact-backed bundle scores every batch with FlatForest (its block-wise
+predict keeps memory bounded), so the pickle is never loaded at all.
+"""
+import hashlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from rootpredict import metrics, settings
+
+logger = logging.getLogger(__name__)
+
+# Largest batch sent to the flat backend when a pickle-sourced bundle also has the scikit-learn model
+FLAT_MAX_ROWS = 2048
+
+
+@dataclass(frozen=True)
+class ModelBundle:
+    """A loaded model together with the metadata needed to score it."""
+    model: object
+    features: list
+    version: str          # Short content hash of the model + feature files
+    load_seconds: float   # Wall time spent unpickling (or mapping) the artifacts
+    loaded_at: float      # time.time() when the load finished
+    fast: object = None   # FlatForest when the "flat" inference backend is active
+    source: str = "pickle"  # "pickle", or "artifact" (memory-mapped; ``model`` is then None)
+
+    @property
+    def backend(self):
+        return "flat" if self.fast is not None else "sklearn"
+
+    def predict(self, matrix):
+        """Predict from a 2-D array whose columns follow ``features``."""
+        # FlatForest wins on the small interactive batches; scikit-learn's compiled traversal is
+        # faster on very large ones (see benchmarks/bench_inference.py), but only a pickle-sourced
+        # bundle has it: an artifact-backed one stays on FlatForest rather than unpickling the model
+        if self.fast is not None and (self.model is None or len(matrix) <= FLAT_MAX_ROWS):
+            return self.fast.predict(matrix)
+        import pandas as pd
+
+        # A DataFrame keeps the feature names the model was fitted with (avoids sklearn warnings)
+        return self.model.predict(pd.DataFrame(np.asarray(matrix, dtype=np.float64), columns=self.features))
+
+    def predict_per_tree(self, matrix):
+        """Every tree's prediction for every row: shape (n_trees, n_rows)."""
+        if self.fast is not None:
+            return self.fast.predict_per_tree(matrix)
+        # Fallback when the forest could not be flattened: one call per tree
+        matrix = np.asarray(matrix, dtype=np.float64)
+        return np.stack([estimator.predict(matrix) for estimator in self.model.estimators_])
+
+
+def _file_signature(path):
+    # Cheap change detector: checked on every access, so it must not read the file
+    if not path:
+        return None
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _content_hash(*paths):
+    digest = hashlib.sha256()
+    for path in paths:
+        with open(path, "rb") as fh:
+            for chunk in iter(lambda: fh.read(1 << 20), b""):
+                digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def _build_fast_forest(model, features):
+    """Flatten the forest and check it against model.predict; None if unsupported or mismatched."""
+    import pandas as pd
+
+    from rootpredict.fast_forest import FlatForest, max_parity_error, parity_sample
+
+    try:
+        fast = FlatForest.from_sklearn(model)
+    except (AttributeError, ValueError) as e:
+        logger.warning("Flat inference backend unavailable, using scikit-learn: %s", e)
+        return None
+    sample = parity_sample(fast, n_rows=64)
+    error = max_parity_error(fast, lambda X: model.predict(pd.DataFrame(X, columns=features)), sample)
+    if error > 1e-6:
+        logger.warning("Flat inference backend disagrees with scikit-learn (max error %.3g); disabled", error)
+        return None
+    return fast
+
+
+class ModelStore:
+    """Loads the model artifacts lazily and reloads them when they change on disk."""
+
+    def __init__(self, model_path=settings.MODEL_PATH, features_path=settings.FEATURES_PATH,
+                 backend=settings.INFERENCE_BACKEND, artifact_path=settings.MODEL_ARTIFACT_PATH):
+        self.model_path = model_path
+        self.features_path = features_path
+        self.backend = backend
+        # Only the flat backend can run from the artifact (it holds no scikit-learn model)
+        self.artifact_path = artifact_path if backend == "flat" else None
+        self._lock = threading.Lock()
+        self._bundle = None
+        self._signature = None
+        self.load_count = 0
+
+    def _pickles_present(self):
+        return os.path.exists(self.model_path) and os.path.exists(self.features_path)
+
+    def files_present(self):
+        return self._pickles_present() or bool(self.artifact_path and os.path.exists(self.artifact_path))
+
+    def _choose_source(self):
+        """("artifact" or "pickle", model version) for the files currently on disk."""
+        from rootpredict.model_artifact import read_header
+
+        pickles = self._pickles_present()
+        if self.artifact_path and os.path.exists(self.artifact_path):
+            try:
+                exported_from = read_header(self.artifact_path)["source_version"]
+            except (OSError, ValueError, KeyError) as e:
+                if not pickles:
+                    raise
+                logger.warning("Ignoring model artifact %s, using the pickle: %s", self.artifact_path, e)
+            else:
+                if not pickles:
+                    return "artifact", exported_from
+                version = _content_hash(self.model_path, self.features_path)
+                if version == exported_from:
+                    return "artifact", version
+                logger.warning("Model artifact %s was exported from other model files; using the pickle "
+                               "(re-run python -m rootpredict.model_artifact export)", self.artifact_path)
+                return "pickle", version
+        if not pickles:
+            raise FileNotFoundError(f"Model files not found: {self.model_path}, {self.features_path}")
+        return "pickle", _content_hash(self.model_path, self.features_path)
+
+    def get(self):
+        """Return the current ModelBundle, loading or reloading it if needed.
+
+        Raises FileNotFoundError if neither the artifact nor both pickles are present.
+        """
+        signature = (_file_signature(self.model_path), _file_signature(self.features_path),
+                     _file_signature(self.artifact_path))
+        bundle = self._bundle
+        if bundle is not None and signature == self._signature:
+            return bundle
+
+        with self._lock:
+            # Another thread may have finished the reload while we waited
+            if self._bundle is not None and signature == self._signature:
+                return self._bundle
+
+            source, version = self._choose_source()
+            if self._bundle is not None and (source, version) == (self._bundle.source, self._bundle.version):
+                # Touched but not changed (e.g. re-copied during a deploy)
+                self._signature = signature
+                return self._bundle
+
+            bundle = None
+            if source == "artifact":
+                try:
+                    bundle = self._load_artifact(version)
+                except (OSError, ValueError) as e:
+                    if not self._pickles_present():
+                        raise
+                    logger.warning("Could not map model artifact %s, using the pickle: %s", self.artifact_path, e)
+            self._bundle = bundle or self._load(version)
+            self._signature = signature
+            return self._bundle
+
+    def _load(self, version):
+        # joblib pulls in scikit-learn while unpickling; keep it off the import path
+        # of app.py so the first page render does not pay for it.
+        import joblib
+
+        start = time.perf_counter()
+        with metrics.span("model.load"):
+            model = joblib.load(self.model_path)
+            features = list(joblib.load(self.features_path))
+            fast = _build_fast_forest(model, features) if self.backend == "flat" else None
+        load_seconds = time.perf_counter() - start
+        self.load_count += 1
+        return ModelBundle(model=model, features=features, version=version,
+                           load_seconds=load_seconds, loaded_at=time.time(), fast=fast)
+
+    def _load_artifact(self, version):
+        from rootpredict.model_artifact import load_artifact
+
+        start = time.perf_counter()
+        with metrics.span("model.load"):
+            fast, features, _ = load_artifact(self.artifact_path)
+        load_seconds = time.perf_counter() - start
+        self.load_count += 1
+        return ModelBundle(model=None, features=features, version=version, load_seconds=load_seconds,
+                           loaded_at=time.time(), fast=fast, source="artifact")
+
+    def clear(self):
+        with self._lock:
+            self._bundle = None
+            self._signature = None
+
@@ -0,0 +1,155 @@
+"""Recommend N, P, K and pesticide levels for a scenario's climate and crop.
+
+A coarse-to-fine grid search over the four input axes, within the page's slider
+bounds: every iteration scores a full grid of candidates in one batched
+predict, then shrinks the box around the best candidate. Candidates are
+snapped to the slider steps and remembered, so points revisited by a finer
+grid are never scored twice, and the search stops once the best objective
+stops improving or the box is down to single slider steps.
+
+The objective is the highest predicted yield. Tree ensembles predict a piecewise
+constant surface, so many candidates tie; ties go to the candidate using the
+least input relative to the crop's historical per-hectare averages (from the
+crop registry).
+"""
+import hashlib
+from dataclasses import dataclass, field
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from rootpredict import metrics
+from rootpredict.engine import PredictionEngine, ScenarioInputs
+from rootpredict.lru import LRUCache
+
+# Search box and resolution per input: (low, high, step), matching the page's sliders
+INPUT_BOUNDS: Dict[str, Tuple[float, float, float]] = {
+    'N': (0.0, 140.0, 1.0),
+    'P': (0.0, 140.0, 1.0),
+    'K': (0.0, 140.0, 1.0),
+    'pesticides_tonnes': (0.0, 500.0, 1.0),
+}
+
+_result_cache = LRUCache(max_entries=128)
+
+
+@dataclass(frozen=True)
+class InputRecommendation:
+    crop: str
+    land_area_ha: float
+    inputs: Dict[str, float]         # Recommended per-hectare N, P, K (kg) and pesticides (tonnes)
+    yield_per_ha: float              # Predicted yield with the recommended inputs
+    current_yield_per_ha: float      # Predicted yield with the scenario's own inputs
+    input_index: float               # Input use relative to the crop's historical averages (1.0 = average)
+    iterations: int
+    evaluations: int                 # Distinct candidates scored
+    converged: bool                  # Stopped early rather than at the iteration limit
+    history: List[float] = field(default_factory=list)  # Best yield after each iteration
+
+    @property
+    def totals(self) -> Dict[str, float]:
+        """Recommended inputs for the whole plot (kg of N/P/K, tonnes of pesticides)."""
+        return {name: value * self.land_area_ha for name, value in self.inputs.items()}
+
+    @property
+    def yield_gain_pct(self) -> float:
+        if not self.current_yield_per_ha:
+            return 0.0
+        return (self.yield_per_ha - self.current_yield_per_ha) / self.current_yield_per_ha * 100
+
+
+def _input_index(candidates: np.ndarray, reference: np.ndarray) -> np.ndarray:
+    return (candidates / reference).mean(axis=1)
+
+
+def _objective_values(yields: np.ndarray, index: np.ndarray) -> np.ndarray:
+    # Input use only breaks ties: it never outweighs a real yield difference
+    return yields - 1e-9 * index
+
+
+def _grid(box: np.ndarray, steps: np.ndarray, levels: int) -> np.ndarray:
+    """Every combination of ``levels`` evenly spaced values per axis, snapped to the slider steps."""
+    axes = [np.unique(np.round(np.linspace(low, high, levels) / step) * step)
+            for (low, high), step in zip(box, steps)]
+    mesh = np.meshgrid(*axes, indexing="ij")
+    return np.column_stack([values.ravel() for values in mesh])
+
+
+def recommend_inputs(engine: PredictionEngine, scenario: ScenarioInputs, levels: int = 7, max_iterations: int = 10, tolerance: float = 1e-6,
+                     patience: int = 2, shrink: float = 0.5) -> InputRecommendation:
+    """Search N/P/K/pesticides for ``scenario``'s crop and climate (cached per model version).
+
+    Each iteration scores a ``levels``^4 grid (2,401 candidates by default) in one
+    batched predict over the current box, re-centres the box on the best candidate and
+    shrinks it by ``shrink``. Stops after ``patience`` iterations without an improvement
+    above ``tolerance``, when the box is down to slider steps, or after ``max_iterations``.
+    """
+    bundle = engine.bundle_for(scenario.crop)
+    names = list(INPUT_BOUNDS)
+    averages = engine.registry.crop(scenario.crop).inputs_per_ha
+    reference = np.array([averages[name] for name in names])
+    columns = [bundle.features.index(name) for name in names]
+    base_row = engine.feature_matrix([scenario], bundle.features)[0]
+
+    # Land area does not change per-hectare results; the climate and crop (the base row minus the inputs) do
+    key_row = base_row.copy()
+    key_row[columns] = 0.0
+    key = (bundle.version, scenario.crop, levels, max_iterations, tolerance, patience, shrink,
+           hashlib.sha1(key_row.tobytes()).hexdigest())
+    cached = _result_cache.get(key)
+    metrics.cache_result("optimizer", "miss" if cached is None else "hit")
+
+    current_yield = float(bundle.predict(base_row[None, :])[0])
+    if cached is None:
+        with metrics.span("optimizer.search"):
+            cached = _search(bundle, base_row, columns, reference, levels, max_iterations,
+                             tolerance, patience, shrink)
+        _result_cache.put(key, cached)
+    best, best_yield, best_index, iterations, evaluations, converged, history = cached
+
+    return InputRecommendation(
+        crop=scenario.crop, land_area_ha=scenario.land_area_ha,
+        inputs={name: float(value) for name, value in zip(names, best)},
+        yield_per_ha=best_yield, current_yield_per_ha=current_yield, input_index=best_index,
+        iterations=iterations, evaluations=evaluations, converged=converged, history=list(history),
+    )
+
+
+def _search(bundle, base_row, columns, reference, levels, max_iterations, tolerance, patience, shrink):
+    bounds = np.array([(low, high) for low, high, _ in INPUT_BOUNDS.values()])
+    steps = np.array([step for _, _, step in INPUT_BOUNDS.values()])
+    box = bounds.copy()
+    scored: Dict[bytes, float] = {}  # Snapped candidate -> predicted yield, reused across iterations
+
+    best, best_value, best_yield, best_index = None, -np.inf, float("nan"), float("nan")
+    history, stale, converged, iteration = [], 0, False, 0
+    for iteration in range(1, max_iterations + 1):
+        candidates = _grid(box, steps, levels)
+        keys = [row.tobytes() for row in candidates]
+        new = [i for i, key in enumerate(keys) if key not in scored]
+        if new:
+            matrix = np.repeat(base_row[None, :], len(new), axis=0)
+            matrix[:, columns] = candidates[new]
+            for i, value in zip(new, bundle.predict(matrix)):
+                scored[keys[i]] = float(value)
+
+        yields = np.array([scored[key] for key in keys])
+        index = _input_index(candidates, reference)
+        values = _objective_values(yields, index)
+        top = int(np.argmax(values))
+        improved = values[top] > best_value + tolerance
+        if values[top] > best_value:
+            best, best_value, best_yield, best_index = candidates[top], values[top], yields[top], index[top]
+        history.append(float(best_yield))
+
+        stale = 0 if improved else stale + 1
+        half_span = np.maximum((box[:, 1] - box[:, 0]) * shrink / 2, steps)
+        if stale >= patience or np.all(box[:, 1] - box[:, 0] <= 2 * steps):
+            converged = True
+            break
+        box = np.column_stack([np.maximum(best - half_span, bounds[:, 0]), np.minimum(best + half_span, bounds[:, 1])])
+    return best, float(best_yield), float(best_index), iteration, len(scored), converged, history
+
+
+def optimizer_cache_stats():
+    return _result_cache.stats()
@@ -0,0 +1,258 @@
+"""Background prefetch of a city's current weather and climate normals.
+
+The fetch buttons used to start all their work on click and block the script
+run on geocoding and the remote calls. The page now hands the city to
+``CityPrefetcher.start`` as soon as the city input changes: a process-wide
+pool geocodes it once and fetches the current weather and the climate normals
+in the background, and the buttons read the handle kept in the session, which
+is usually finished by the time they are clicked.
+
+Work is keyed by (kind, normalized city name). Sessions asking for a city that
+is already being fetched join that task, and successful results are reused for
+a few minutes. Each session subscribes to the tasks it starts and releases them
+when its city changes; queued tasks no other session is waiting for are then
+cancelled (a task that is already running finishes and only warms the caches).
+The page also starts over when its handle failed (so a click retries, as it
+did before prefetching) or is older than ROOTPREDICT_PREFETCH_TTL.
+"""
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
+from typing import Dict
+
+from rootpredict import metrics, settings
+from rootpredict.climate import DEFAULT_END, DEFAULT_START, get_climate_cache
+from rootpredict.geocoding import get_geocoding_service, normalize_city_name
+from rootpredict.lru import LRUCache
+from rootpredict.weather import CityConditions, fetch_current_weather
+
+PREFETCH_KINDS = ("weather", "climate")
+# Longest a button waits for a prefetch that is still running (matches fetch_city_conditions)
+DEFAULT_WAIT_SECONDS = 30.0
+_SERVICE_NAMES = {"weather": "OpenWeather", "climate": "Meteostat"}
+
+
+@dataclass
+class CityPrefetch:
+    """One session's prefetch of one city; kept in st.session_state."""
+    city: str                     # Normalized city name ("" when the input is empty)
+    futures: Dict[str, Future]    # kind -> Future of CityConditions with that kind filled in
+    started_at: float = field(default_factory=time.monotonic)  # When the oldest of the fetches started
+
+    def matches(self, city_name):
+        return normalize_city_name(city_name) == self.city
+
+    @property
+    def failed(self):
+        """True once a finished fetch raised (geocoding) or stored a weather or climate error."""
+        for future in self.futures.values():
+            if not future.done() or future.cancelled():
+                continue
+            if future.exception() is not None:
+                return True
+            conditions = future.result()
+            if conditions.weather_error is not None or conditions.normals_error is not None:
+                return True
+        return False
+
+    def needs_refresh(self, max_age_seconds=settings.PREFETCH_TTL_SECONDS):
+        """Whether to start over: a fetch failed (retry, as a click used to) or the results are too old."""
+        return self.failed or time.monotonic() - self.started_at > max_age_seconds
+
+    def result(self, kind, timeout=DEFAULT_WAIT_SECONDS):
+        """CityConditions for ``kind`` ("weather" or "climate"), waiting up to ``timeout`` seconds.
+
+        Geocoding errors propagate, as do requests errors from the fetch itself. Other fetch
+        errors are stored on the result (``weather_error`` / ``normals_error``), and a timeout
+        raises TimeoutError.
+        """
+        try:
+            with metrics.span("prefetch.wait"):
+                conditions = self.futures[kind].result(timeout=timeout)
+        except FutureTimeoutError:
+            raise TimeoutError(f"no answer from {_SERVICE_NAMES[kind]} within {timeout:.0f}s") from None
+        error = conditions.weather_error if kind == "weather" else conditions.normals_error
+        if _is_network_error(error):
+            raise error
+        return conditions
+
+    def conditions(self, timeout=DEFAULT_WAIT_SECONDS):
+        """Both fetches merged into one CityConditions, as returned by weather.fetch_city_conditions."""
+        weather, climate = self.futures["weather"], self.futures["climate"]
+        with metrics.span("prefetch.wait"):
+            wait([weather, climate], timeout=timeout)
+        finished = [future.result() for future in (weather, climate) if future.done()]
+        if not finished:
+            raise TimeoutError(f"no answer from OpenWeather or Meteostat within {timeout:.0f}s")
+
+        result = CityConditions(location=finished[0].location)
+        if weather.done():
+            result.weather, result.weather_error = weather.result().weather, weather.result().weather_error
+        else:
+            result.weather_error = TimeoutError(f"no answer from OpenWeather within {timeout:.0f}s")
+        if climate.done():
+            result.normals, result.normals_error = climate.result().normals, climate.result().normals_error
+        else:
+            result.normals_error = TimeoutError(f"no answer from Meteostat within {timeout:.0f}s")
+        return result
+
+
+def _is_network_error(error):
+    # Connection problems are reported by the page's own requests handlers rather than per service
+    import requests
+
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+
+class _Task:
+    __slots__ = ("future", "subscribers", "started_at")
+
+    def __init__(self, future):
+        self.future = future
+        self.subscribers = set()
+        self.started_at = time.monotonic()
+
+
+class CityPrefetcher:
+    """Deduplicating background fetches of weather and climate normals per city."""
+
+    def __init__(self, api_key, geocoder=None, climate_cache=None, start=DEFAULT_START, end=DEFAULT_END,
+                 max_workers=4, result_ttl_seconds=settings.PREFETCH_TTL_SECONDS):
+        self.api_key = api_key
+        self.geocoder = geocoder or get_geocoding_service(api_key)
+        self.climate_cache = climate_cache or get_climate_cache()
+        self.start_date = start
+        self.end_date = end
+        # A pool of its own: the tasks block on remote calls, and tasks on the shared I/O pool
+        # (http_client.run_concurrently) must not queue behind them
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="rootpredict-prefetch")
+        # Re-entrant: cancelling a future runs its done callback (_finish) in the calling thread
+        self._lock = threading.RLock()
+        self._tasks = {}       # (kind, city) -> _Task still queued or running
+        self._geocoding = {}   # city -> Future of the lookup in progress
+        self._finished = LRUCache(max_entries=256, ttl_seconds=result_ttl_seconds)  # (kind, city) -> _Task
+        self.submitted = 0
+        self.joined = 0
+        self.reused = 0
+        self.cancelled = 0
+
+    def start(self, city_name, subscriber):
+        """Start (or join) the fetches for ``city_name`` on behalf of ``subscriber``; returns a CityPrefetch."""
+        city = normalize_city_name(city_name)
+        if not city:
+            # Nothing to look up; the buttons report it like an unknown city
+            empty = Future()
+            empty.set_result(CityConditions(location=None))
+            return CityPrefetch(city, {kind: empty for kind in PREFETCH_KINDS})
+        tasks = {kind: self._submit(kind, city, subscriber) for kind in PREFETCH_KINDS}
+        # A reused result is as old as the fetch that produced it, not as this handle
+        return CityPrefetch(city, {kind: task.future for kind, task in tasks.items()},
+                            started_at=min(task.started_at for task in tasks.values()))
+
+    def release(self, prefetch, subscriber):
+        """``subscriber`` no longer needs ``prefetch``; cancels its queued tasks nobody else is waiting for."""
+        with self._lock:
+            for kind, future in prefetch.futures.items():
+                task = self._tasks.get((kind, prefetch.city))
+                if task is None or task.future is not future:
+                    continue
+                task.subscribers.discard(subscriber)
+                if not task.subscribers and future.cancel():
+                    self._tasks.pop((kind, prefetch.city), None)
+                    self.cancelled += 1
+                    metrics.cache_result("prefetch", "cancelled")
+
+    def _submit(self, kind, city, subscriber):
+        key = (kind, city)
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None:
+                finished = self._finished.get(key)
+                if finished is not None:
+                    self.reused += 1
+                    metrics.cache_result("prefetch", "hit")
+                    return finished
+                task = self._tasks[key] = _Task(self._executor.submit(self._run, kind, city))
+                task.future.add_done_callback(lambda future: self._finish(key, future))
+                self.submitted += 1
+                metrics.cache_result("prefetch", "miss")
+            else:
+                self.joined += 1
+                metrics.cache_result("prefetch", "joined")
+            task.subscribers.add(subscriber)
+            return task
+
+    def _finish(self, key, future):
+        with self._lock:
+            task = self._tasks.get(key)
+            if task is None or task.future is not future:
+                return
+            del self._tasks[key]
+            if future.cancelled() or future.exception() is not None:
+                return
+            conditions = future.result()
+            # Failed fetches are retried by the next session that asks instead of being reused
+            if conditions.weather_error is None and conditions.normals_error is None:
+                self._finished.put(key, task)
+
+    def _run(self, kind, city):
+        location = self._geocode(city)
+        result = CityConditions(location=location)
+        if location is None:
+            return result
+        with metrics.span(f"prefetch.{kind}"):
+            try:
+                if kind == "weather":
+                    result.weather = fetch_current_weather(location.lat, location.lon, self.api_key)
+                else:
+                    result.normals = self.climate_cache.get(location.lat, location.lon,
+                                                            self.start_date, self.end_date)
+            except Exception as e:
+                if kind == "weather":
+                    result.weather_error = e
+                else:
+                    result.normals_error = e
+        return result
+
+    def _geocode(self, city):
+        """Look ``city`` up once even when its weather and climate tasks start together."""
+        with self._lock:
+            pending = self._geocoding.get(city)
+            owner = pending is None
+            if owner:
+                pending = self._geocoding[city] = Future()
+        if not owner:
+            # The owner is running (not queued), so this wait cannot deadlock the pool
+            return pending.result()
+        try:
+            location = self.geocoder.lookup(city)
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        else:
+            pending.set_result(location)
+            return location
+        finally:
+            with self._lock:
+                self._geocoding.pop(city, None)
+
+    def stats(self):
+        with self._lock:
+            in_flight = len(self._tasks)
+        return {"in_flight": in_flight, "submitted": self.submitted, "joined": self.joined,
+                "reused": self.reused, "cancelled": self.cancelled, "finished": self._finished.stats()}
+
+
+# Shared by every session in this server process (one per API key)
+_prefetchers = {}
+_prefetchers_lock = threading.Lock()
+
+
+def get_prefetcher(api_key):
+    with _prefetchers_lock:
+        prefetcher = _prefetchers.get(api_key)
+        if prefetcher is None:
+            prefetcher = _prefetchers[api_key] = CityPrefetcher(api_key)
+        return prefetcher
@@ -0,0 +1,215 @@
+"""Manifest-driven registry of the supported crops and the models that score them.
+
+``crops.json`` lists every crop with its model, historical baseline and input
+defaults, and every model with its files (paths relative to the manifest)::
+
+    {"format": 1,
+     "models": {"maize_rice_rf": {"model": "crop_yield_model.pkl", "features": "model_features.pkl",
+                                  "artifact": "crop_yield_model.rpf"}},
+     "crops": {"maize": {"label": "Maize", "model": "maize_rice_rf",
+                         "historical_yield_t_per_ha": 363.10,
+                         "inputs_per_ha": {"N": 77.76, "P": 48.44, "K": 19.79, "pesticides_tonnes": 327.66},
+                         "growing_season_months": 5}}}
+
+Several crops can share one model (the original forest scores maize and rice
+through one-hot ``label_<crop>`` features); a crop routed to a model that has
+label features but none for that crop is rejected when it is scored rather
+than silently scored with every label at 0. Crop entries are plain reference
+data; a model is only loaded the first time one of its crops is scored, and
+loaded models sit in an LRU bounded by total size (ROOTPREDICT_MODEL_CACHE_MB)
+and count (ROOTPREDICT_MODEL_CACHE_MAX_MODELS), so memory stays flat as crops
+are added and the models of crops nobody is using are evicted.
+"""
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
+from rootpredict import metrics, settings
+from rootpredict.lru import LRUCache
+from rootpredict.model_store import ModelBundle, ModelStore
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FORMAT = 1
+# Per-hectare inputs every crop entry must give (kg/ha of N, P, K; tonnes/ha base of pesticides)
+INPUT_NAMES = ("N", "P", "K", "pesticides_tonnes")
+
+
+class UnknownCropError(ValueError):
+    """The crop is not in the manifest."""
+
+
+class UnscorableCropError(ValueError):
+    """The crop's model one-hot encodes crops but has no ``label_<crop>`` feature for it."""
+
+
+@dataclass(frozen=True)
+class ModelSpec:
+    model_id: str
+    model_path: str
+    features_path: str
+    artifact_path: Optional[str] = None   # Memory-mappable export (rootpredict/model_artifact.py)
+
+
+@dataclass(frozen=True)
+class CropSpec:
+    name: str
+    label: str
+    model_id: str
+    historical_yield: float               # Historical average yield (tonnes/ha)
+    inputs_per_ha: Dict[str, float]       # Historical average N, P, K (kg/ha) and pesticides (tonnes/ha base)
+    growing_season_months: int = 4        # Placed on the wettest run of this many months
+
+
+def load_manifest(path):
+    """({model id: ModelSpec}, {crop name: CropSpec}) from ``path``; raises ValueError when malformed."""
+    with open(path, encoding="utf-8") as fh:
+        manifest = json.load(fh)
+    if manifest.get("format") != MANIFEST_FORMAT:
+        raise ValueError(f"{path}: unsupported crops manifest format {manifest.get('format')!r}")
+    base_dir = os.path.dirname(os.path.abspath(path))
+
+    def resolve(relative):
+        return os.path.join(base_dir, relative) if relative else None
+
+    models = {}
+    for model_id, entry in manifest.get("models", {}).items():
+        try:
+            models[model_id] = ModelSpec(model_id, resolve(entry["model"]), resolve(entry["features"]),
+                                         resolve(entry.get("artifact")))
+        except KeyError as e:
+            raise ValueError(f"{path}: model {model_id!r} is missing {e}") from None
+
+    crops = {}
+    for name, entry in manifest.get("crops", {}).items():
+        name = name.strip().lower()
+        try:
+            spec = CropSpec(name=name, label=entry.get("label", name.capitalize()), model_id=entry["model"],
+                            historical_yield=float(entry["historical_yield_t_per_ha"]),
+                            inputs_per_ha={key: float(entry["inputs_per_ha"][key]) for key in INPUT_NAMES},
+                            growing_season_months=int(entry.get("growing_season_months", 4)))
+        except KeyError as e:
+            raise ValueError(f"{path}: crop {name!r} is missing {e}") from None
+        if spec.model_id not in models:
+            raise ValueError(f"{path}: crop {name!r} refers to unknown model {spec.model_id!r}")
+        crops[name] = spec
+    if not crops:
+        raise ValueError(f"{path}: no crops defined")
+    return models, crops
+
+
+def check_crop_label(crop, features):
+    """Raise UnscorableCropError unless ``features`` has ``label_<crop>`` or no label features at all."""
+    labels = [feature[len("label_"):] for feature in features if feature.startswith("label_")]
+    if labels and crop not in labels:
+        raise UnscorableCropError(f"Crop {crop!r} cannot be scored: its model has no 'label_{crop}' feature "
+                                  f"(it was trained on: {', '.join(labels)})")
+
+
+def _estimated_bytes(store, bundle):
+    # Flat arrays (mapped or in memory) plus, for a pickle-backed model, its size on disk
+    size = bundle.fast.nbytes() if bundle.fast is not None else 0
+    if bundle.model is not None:
+        size += os.path.getsize(store.model_path)
+    return size
+
+
+class ModelRegistry:
+    """Crop reference data from the manifest plus a size-bounded LRU of lazily loaded models."""
+
+    def __init__(self, manifest_path=settings.CROPS_MANIFEST_PATH, max_bytes=settings.MODEL_CACHE_MB * 2 ** 20,
+                 max_models=settings.MODEL_CACHE_MAX_MODELS, backend=settings.INFERENCE_BACKEND):
+        self.manifest_path = manifest_path
+        self.models, self.crops = load_manifest(manifest_path)
+        self.backend = backend
+        self._stores = LRUCache(max_entries=max_models, max_weight=max_bytes)
+        self._load_locks = {model_id: threading.Lock() for model_id in self.models}
+        self.first_use_seconds = {}  # model id -> load time when it was first needed
+        self.load_counts = {}        # model id -> loads on first use and after eviction
+        self._bytes = {}             # model id -> estimated size when last loaded
+
+    @property
+    def crop_names(self) -> List[str]:
+        return list(self.crops)
+
+    def crop(self, name) -> CropSpec:
+        spec = self.crops.get(name)
+        if spec is None:
+            raise UnknownCropError(f"Unknown crop {name!r}. Supported: {', '.join(self.crops)}")
+        return spec
+
+    def _new_store(self, model_id):
+        spec = self.models[model_id]
+        return ModelStore(spec.model_path, spec.features_path, backend=self.backend, artifact_path=spec.artifact_path)
+
+    def available_crops(self) -> List[str]:
+        """Crops whose model files are on disk (checked without loading anything)."""
+        present = {model_id: self._new_store(model_id).files_present() for model_id in self.models}
+        return [name for name, spec in self.crops.items() if present[spec.model_id]]
+
+    def store(self, model_id) -> ModelStore:
+        """The model's store, loading the model on first use (or after it was evicted)."""
+        store = self._stores.get(model_id)
+        metrics.cache_result("model_registry", "miss" if store is None else "hit")
+        if store is not None:
+            return store
+        with self._load_locks[model_id]:
+            # Another session may have loaded it while we waited
+            store = self._stores.get(model_id)
+            if store is not None:
+                return store
+            store = self._new_store(model_id)
+            bundle = store.get()
+            self.load_counts[model_id] = self.load_counts.get(model_id, 0) + 1
+            self.first_use_seconds.setdefault(model_id, bundle.load_seconds)
+            self._bytes[model_id] = _estimated_bytes(store, bundle)
+            logger.info("Loaded model %s (%s, %d bytes) in %.3fs", model_id, bundle.source,
+                        self._bytes[model_id], bundle.load_seconds)
+            for name, spec in self.crops.items():
+                if spec.model_id != model_id:
+                    continue
+                try:
+                    check_crop_label(name, bundle.features)
+                except UnscorableCropError as e:
+                    logger.warning("crops.json routes %s to model %s: %s", name, model_id, e)
+            self._stores.put(model_id, store, weight=self._bytes[model_id])
+            return store
+
+    def bundle(self, crop) -> ModelBundle:
+        """The loaded model that scores ``crop`` (raises UnscorableCropError if it cannot tell ``crop`` apart)."""
+        bundle = self.store(self.crop(crop).model_id).get()
+        check_crop_label(crop, bundle.features)
+        return bundle
+
+    def preload(self, crops=None):
+        """Load the models of ``crops`` (default: every crop), at most as many as the cache holds."""
+        model_ids = list(dict.fromkeys(self.crop(name).model_id for name in (crops or self.crops)))
+        for model_id in model_ids[:self._stores.max_entries]:
+            self.store(model_id)
+
+    def stats(self):
+        loaded = set(self._stores.keys())
+        models = [{"model": model_id, "crops": ", ".join(name for name, spec in self.crops.items()
+                                                          if spec.model_id == model_id),
+                   "loaded": model_id in loaded, "loads": self.load_counts.get(model_id, 0),
+                   "first_use_seconds": self.first_use_seconds.get(model_id),
+                   "bytes": self._bytes.get(model_id)}
+                  for model_id in self.models]
+        return {"models": models, "cache": self._stores.stats()}
+
+
+_default_registry = None
+_default_registry_lock = threading.Lock()
+
+
+def get_registry() -> ModelRegistry:
+    """The process-wide registry, read from settings.CROPS_MANIFEST_PATH on first use."""
+    global _default_registry
+    if _default_registry is None:
+        with _default_registry_lock:
+            if _default_registry is None:
+                _default_registry = ModelRegistry()
+    return _default_registry
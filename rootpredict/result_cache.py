@@ -0,0 +1,101 @@
+"""Memoized per-tree predictions keyed on quantized input vectors.
+
+Streamlit reruns the whole page on every interaction and the sliders move in
+fixed steps, so the same input vectors come back again and again, within one
+session and across sessions. PredictionCache remembers the per-tree outputs
+for each (model version, quantized feature vector) pair in a bounded,
+thread-safe LRU and drops a model's entries when that model changes.
+"""
+import threading
+
+import numpy as np
+
+from rootpredict import metrics
+from rootpredict.lru import LRUCache
+
+# Key resolution per feature: a tenth of the page's slider step, so every reachable
+# slider position gets its own entry while float noise (25.0 + 1.5 vs 26.5) collapses.
+QUANTIZATION_STEPS = {
+    'N': 0.1,
+    'P': 0.1,
+    'K': 0.1,
+    'temperature': 0.01,
+    'avg_temp': 0.01,
+    'humidity': 0.01,
+    'ph': 0.01,
+    'rainfall': 0.1,
+    'average_rain_fall_mm_per_year': 1.0,
+    'pesticides_tonnes': 0.1,
+}
+DEFAULT_STEP = 0.001
+
+
+class PredictionCache:
+    def __init__(self, max_entries=4096):
+        self._entries = LRUCache(max_entries=max_entries)
+        self._lock = threading.Lock()
+        self._versions = {}  # model id -> version whose entries are stored
+        self._steps_for = {}  # tuple(model_features) -> step array
+        self.invalidations = 0
+
+    def _steps(self, model_features):
+        key = tuple(model_features)
+        steps = self._steps_for.get(key)
+        if steps is None:
+            steps = np.array([QUANTIZATION_STEPS.get(f, DEFAULT_STEP) for f in model_features])
+            self._steps_for[key] = steps
+        return steps
+
+    def keys_for(self, version, matrix, model_features):
+        """Cache keys for each row of ``matrix`` (columns in ``model_features`` order)."""
+        quantized = np.rint(np.asarray(matrix, dtype=np.float64) / self._steps(model_features)).astype(np.int64)
+        return [(version, row.tobytes()) for row in quantized]
+
+    def _check_version(self, version, model):
+        # A new version of a model makes its stored entries unreachable; free them at once
+        with self._lock:
+            previous = self._versions.get(model)
+            if previous != version:
+                if previous is not None:
+                    for key in self._entries.keys():
+                        if key[0] == previous:
+                            self._entries.pop(key)
+                    self.invalidations += 1
+                self._versions[model] = version
+
+    def get_or_compute(self, version, matrix, model_features, compute, model=None):
+        """Per-tree outputs (n_trees, n_rows) for ``matrix``, scoring only uncached rows.
+
+        ``compute`` receives the uncached rows as one matrix and must return their
+        per-tree outputs, so misses are still scored in a single batch. ``model``
+        names the model (registry id) whose ``version`` this is.
+        """
+        self._check_version(version, model)
+        keys = self.keys_for(version, matrix, model_features)
+        columns = [self._entries.get(key) for key in keys]
+        missing = [i for i, column in enumerate(columns) if column is None]
+        metrics.cache_result("prediction", "hit", len(keys) - len(missing))
+        metrics.cache_result("prediction", "miss", len(missing))
+        if missing:
+            scored = compute(np.asarray(matrix)[missing])
+            for position, i in enumerate(missing):
+                column = np.array(scored[:, position])
+                column.setflags(write=False)
+                columns[i] = column
+                self._entries.put(keys[i], column)
+        return np.column_stack(columns)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        stats = self._entries.stats()
+        stats["invalidations"] = self.invalidations
+        return stats
+
+
+_default_cache = PredictionCache()
+
+
+def get_prediction_cache():
+    return _default_cache
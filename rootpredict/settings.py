@@ -0,0 +1,57 @@
+"""Shared file locations and environment-driven settings."""
+import os
+
+# Repository root (the directory that holds app.py and the model artifacts)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Supported crops: model files, feature lists, historical baselines and input defaults per crop
+CROPS_MANIFEST_PATH = os.environ.get("ROOTPREDICT_CROPS_MANIFEST", os.path.join(BASE_DIR, "crops.json"))
+# Loaded models are kept in an LRU bounded by total size and count; cold crops' models are evicted
+MODEL_CACHE_MB = float(os.environ.get("ROOTPREDICT_MODEL_CACHE_MB", "512"))
+MODEL_CACHE_MAX_MODELS = int(os.environ.get("ROOTPREDICT_MODEL_CACHE_MAX_MODELS", "8"))
+
+# Default model files (the export tool's defaults; the app takes its model files from the manifest)
+MODEL_PATH = os.environ.get("ROOTPREDICT_MODEL_PATH", os.path.join(BASE_DIR, "crop_yield_model.pkl"))
+FEATURES_PATH = os.environ.get("ROOTPREDICT_FEATURES_PATH", os.path.join(BASE_DIR, "model_features.pkl"))
+# Memory-mappable export of the two files above (python -m rootpredict.model_artifact export);
+# preferred by the flat backend when present and exported from the current pickles
+MODEL_ARTIFACT_PATH = os.environ.get("ROOTPREDICT_MODEL_ARTIFACT_PATH", os.path.join(BASE_DIR, "crop_yield_model.rpf"))
+
+# Local caches (geocoding, climate data); safe to delete at any time
+CACHE_DIR = os.environ.get("ROOTPREDICT_CACHE_DIR", os.path.join(BASE_DIR, ".cache"))
+GEOCODE_DB_PATH = os.path.join(CACHE_DIR, "geocode.sqlite3")
+CLIMATE_DB_PATH = os.path.join(CACHE_DIR, "climate_normals.sqlite3")
+
+# Climate normals are cached per grid cell; 0.1 degrees is roughly 11 km at the equator
+CLIMATE_GRID_DEGREES = float(os.environ.get("ROOTPREDICT_CLIMATE_GRID_DEG", "0.1"))
+
+# Precomputed climate table for the service region (built by `python -m rootpredict.climate_table build`)
+CLIMATE_TABLE_DIR = os.environ.get("ROOTPREDICT_CLIMATE_TABLE", os.path.join(BASE_DIR, "climate_table"))
+
+# OpenWeather endpoints (the base URL can point at a local stub for offline runs)
+OPENWEATHER_BASE_URL = os.environ.get("ROOTPREDICT_OPENWEATHER_URL", "https://api.openweathermap.org").rstrip("/")
+OPENWEATHER_GEOCODE_URL = OPENWEATHER_BASE_URL + "/geo/1.0/direct"
+OPENWEATHER_WEATHER_URL = OPENWEATHER_BASE_URL + "/data/2.5/weather"
+
+# Outbound HTTP: (connect, read) timeouts in seconds and retry budget
+HTTP_CONNECT_TIMEOUT = float(os.environ.get("ROOTPREDICT_HTTP_CONNECT_TIMEOUT", "3.05"))
+HTTP_READ_TIMEOUT = float(os.environ.get("ROOTPREDICT_HTTP_READ_TIMEOUT", "10"))
+HTTP_MAX_RETRIES = int(os.environ.get("ROOTPREDICT_HTTP_MAX_RETRIES", "2"))
+
+# Background prefetch of the city's weather and climate data while the user sets up the scenario
+# (rootpredict/prefetch.py); with it off, the fetch buttons start the same work on click
+PREFETCH_ENABLED = os.environ.get("ROOTPREDICT_PREFETCH", "1").lower() in ("1", "true", "yes", "on")
+# Successful prefetches are reused by every session for this long (current weather goes stale)
+PREFETCH_TTL_SECONDS = float(os.environ.get("ROOTPREDICT_PREFETCH_TTL", "600"))
+
+# Inference backend: "flat" evaluates the forest from flattened NumPy arrays (rootpredict/fast_forest.py),
+# "sklearn" always calls model.predict. "flat" falls back to sklearn if the model cannot be flattened.
+INFERENCE_BACKEND = os.environ.get("ROOTPREDICT_INFERENCE_BACKEND", "flat").lower()
+
+# Metrics (rootpredict/metrics.py): off unless ROOTPREDICT_METRICS=1; setting a port also serves /metrics
+METRICS_PORT = int(os.environ["ROOTPREDICT_METRICS_PORT"]) if os.environ.get("ROOTPREDICT_METRICS_PORT") else None
+METRICS_ENABLED = os.environ.get("ROOTPREDICT_METRICS", "0").lower() in ("1", "true", "yes", "on") or METRICS_PORT is not None
+# While metrics are on, every stage histogram and counter is also logged this often (0 turns the summaries off)
+METRICS_LOG_INTERVAL_SECONDS = float(os.environ.get("ROOTPREDICT_METRICS_LOG_INTERVAL", "60"))
+# Show the per-rerun timing panel toggle to every session (it is otherwise only offered with ?debug=1)
+DEBUG_PANEL = os.environ.get("ROOTPREDICT_DEBUG_PANEL", "0").lower() in ("1", "true", "yes", "on")
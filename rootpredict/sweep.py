@@ -0,0 +1,102 @@
+"""Climate-scenario sweeps: score a whole grid of climate shifts in one model call.
+
+Instead of comparing three fixed scenarios one rerun at a time, a sweep builds
+every combination of temperature offsets x rainfall factors (optionally x
+humidity and pH levels) around a base scenario, scores the grid with a single
+batched predict and returns a yield surface plus partial-dependence curves.
+
+Results are cached on the exact feature matrix, so changes that do not alter
+the grid (land area, or the slider of an axis that is being swept) reuse the
+previous surface.
+"""
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from rootpredict import metrics
+from rootpredict.engine import PredictionEngine, ScenarioInputs, feature_vector, shift_climate
+from rootpredict.lru import LRUCache
+
+_sweep_cache = LRUCache(max_entries=64)
+
+
+@dataclass(frozen=True)
+class SweepResult:
+    axes: Dict[str, np.ndarray]   # Axis name -> values, in grid order (only the swept axes)
+    yields: np.ndarray            # Predicted yield (tonnes/ha), one dimension per swept axis
+    base_yield: float             # Prediction for the unshifted base scenario
+    model_version: str
+
+    def partial_dependence(self, axis: str) -> pd.Series:
+        """Mean yield along ``axis`` with every other swept axis averaged out."""
+        position = list(self.axes).index(axis)
+        other = tuple(i for i in range(self.yields.ndim) if i != position)
+        return pd.Series(self.yields.mean(axis=other), index=pd.Index(self.axes[axis], name=axis),
+                         name="yield_t_per_ha")
+
+    def surface(self) -> pd.DataFrame:
+        """Long-format temp_offset x rainfall_factor table (other axes averaged) for a heatmap."""
+        grid = self.yields.reshape(self.yields.shape[0], self.yields.shape[1], -1).mean(axis=2)
+        temps, rains = np.meshgrid(self.axes["temp_offset"], self.axes["rainfall_factor"], indexing="ij")
+        return pd.DataFrame({"temp_offset": temps.ravel(), "rainfall_factor": rains.ravel(),
+                             "yield_t_per_ha": grid.ravel()})
+
+    @property
+    def n_points(self) -> int:
+        return int(self.yields.size)
+
+
+def build_sweep_matrix(base: ScenarioInputs, model_features: Sequence[str], axes: Dict[str, np.ndarray]) -> np.ndarray:
+    """Feature matrix for every grid point, rows in C order over ``axes``.
+
+    Temperature offsets shift both temperature features; rainfall factors scale both the
+    seasonal and the annual rainfall; humidity and pH axes replace the base value.
+    """
+    base_values = feature_vector(base.feature_row(), model_features)
+    mesh = np.meshgrid(*axes.values(), indexing="ij")
+    points = {name: values.ravel() for name, values in zip(axes, mesh)}
+    n_points = mesh[0].size
+
+    columns = {}
+    for feature, value in zip(model_features, base_values):
+        columns[feature] = np.full(n_points, value)
+    columns = shift_climate(columns, points.get("temp_offset", 0.0), points.get("rainfall_factor", 1.0))
+    for name in ("humidity", "ph"):
+        if name in points:
+            columns[name] = points[name]
+    return np.column_stack([columns[feature] for feature in model_features])
+
+
+def run_sweep(engine: PredictionEngine, base: ScenarioInputs, temp_offsets: Sequence[float],
+              rainfall_factors: Sequence[float], humidity_values: Optional[Sequence[float]] = None,
+              ph_values: Optional[Sequence[float]] = None) -> SweepResult:
+    """Score the full grid around ``base`` in one batched predict (cached)."""
+    axes = {"temp_offset": np.asarray(temp_offsets, dtype=np.float64),
+            "rainfall_factor": np.asarray(rainfall_factors, dtype=np.float64)}
+    if humidity_values is not None:
+        axes["humidity"] = np.asarray(humidity_values, dtype=np.float64)
+    if ph_values is not None:
+        axes["ph"] = np.asarray(ph_values, dtype=np.float64)
+
+    bundle = engine.bundle_for(base.crop)
+    matrix = build_sweep_matrix(base, bundle.features, axes)
+    # The base point is cheap to score on its own and is left out of the key, so the key
+    # only changes when the grid itself does
+    base_yield = float(bundle.predict(engine.feature_matrix([base], bundle.features))[0])
+    shape = tuple(len(values) for values in axes.values())
+    key = (bundle.version, tuple(axes), shape, hashlib.sha1(matrix.tobytes()).hexdigest())
+
+    yields = _sweep_cache.get(key)
+    metrics.cache_result("sweep", "miss" if yields is None else "hit")
+    if yields is None:
+        with metrics.span("sweep.predict"):
+            yields = bundle.predict(matrix).reshape(shape)
+        _sweep_cache.put(key, yields)
+    return SweepResult(axes=axes, yields=yields, base_yield=base_yield, model_version=bundle.version)
+
+
+def sweep_cache_stats():
+    return _sweep_cache.stats()
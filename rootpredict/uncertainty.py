@@ -0,0 +1,70 @@
+"""Turning per-tree forest outputs into yield intervals and exceedance probabilities.
+
+A RandomForest's prediction is the mean of its trees, so the spread of the
+individual trees is available for free from the same batched evaluation. The
+helpers here summarise such samples (quantile interval, probability of beating
+the historical average) and generate Monte Carlo input jitter for the climate
+features as one matrix, so thousands of samples are scored in a single call.
+"""
+from dataclasses import dataclass
+from typing import Dict, Sequence
+
+import numpy as np
+
+# Default central interval reported on the page (5th to 95th percentile)
+DEFAULT_INTERVAL = (0.05, 0.95)
+
+
+@dataclass(frozen=True)
+class YieldDistribution:
+    mean: float
+    median: float
+    low: float                     # Lower interval bound (tonnes/ha)
+    high: float                    # Upper interval bound (tonnes/ha)
+    interval: tuple                # Quantile levels of (low, high)
+    prob_above_historical: float   # Share of samples above the crop's historical average
+    n_samples: int
+    samples: np.ndarray            # Raw samples, e.g. for a histogram
+
+
+def summarize_samples(samples, historical_avg, interval=DEFAULT_INTERVAL) -> YieldDistribution:
+    samples = np.asarray(samples, dtype=np.float64).ravel()
+    low, median, high = np.quantile(samples, [interval[0], 0.5, interval[1]])
+    return YieldDistribution(
+        mean=float(samples.mean()),
+        median=float(median),
+        low=float(low),
+        high=float(high),
+        interval=tuple(interval),
+        prob_above_historical=float((samples > historical_avg).mean()) if historical_avg else float("nan"),
+        n_samples=int(samples.size),
+        samples=samples,
+    )
+
+
+def jitter_climate(base_row: np.ndarray, model_features: Sequence[str], n_samples: int,
+                   temp_sd: float, rainfall_cv: float, humidity_sd: float, seed=None) -> np.ndarray:
+    """``n_samples`` copies of ``base_row`` with random climate perturbations.
+
+    Temperature gets one normal offset (sd ``temp_sd`` °C) applied to both temperature
+    features; seasonal and annual rainfall share one multiplicative factor with
+    coefficient of variation ``rainfall_cv`` (truncated at zero); humidity gets a normal
+    offset clipped to 0-100 %.
+    """
+    rng = np.random.default_rng(seed)
+    columns: Dict[str, int] = {name: j for j, name in enumerate(model_features)}
+    matrix = np.repeat(np.asarray(base_row, dtype=np.float64)[None, :], n_samples, axis=0)
+
+    temp_offset = rng.normal(0.0, temp_sd, n_samples)
+    rain_factor = np.clip(rng.normal(1.0, rainfall_cv, n_samples), 0.0, None)
+    humidity_offset = rng.normal(0.0, humidity_sd, n_samples)
+
+    for name in ("temperature", "avg_temp"):
+        if name in columns:
+            matrix[:, columns[name]] += temp_offset
+    for name in ("rainfall", "average_rain_fall_mm_per_year"):
+        if name in columns:
+            matrix[:, columns[name]] *= rain_factor
+    if "humidity" in columns:
+        matrix[:, columns["humidity"]] = np.clip(matrix[:, columns["humidity"]] + humidity_offset, 0.0, 100.0)
+    return matrix
@@ -0,0 +1,80 @@
+"""Current weather from OpenWeather and the combined city fetch.
+
+``fetch_city_conditions`` geocodes a city once and then runs the current-weather
+call and the climate-normals lookup side by side on the shared I/O pool, so the
+slower of the two bounds the wait instead of their sum.
+"""
+from dataclasses import dataclass
+
+from rootpredict import metrics, settings
+from rootpredict.climate import DEFAULT_END, DEFAULT_START, get_climate_cache
+from rootpredict.http_client import get_http_client, run_concurrently
+
+
+class WeatherServiceError(Exception):
+    """OpenWeather answered, but not with usable weather data."""
+
+
+@dataclass(frozen=True)
+class CurrentWeather:
+    temp: float
+    humidity: float
+    description: str
+
+
+@dataclass
+class CityConditions:
+    """Outcome of fetch_city_conditions; each half can fail independently."""
+    location: object                # GeoLocation, or None if the city was not found
+    weather: CurrentWeather = None
+    weather_error: Exception = None
+    normals: object = None          # ClimateNormals, or None if Meteostat had no data
+    normals_error: Exception = None
+
+
+def fetch_current_weather(lat, lon, api_key, client=None):
+    """Return CurrentWeather for a point; raises WeatherServiceError on a non-200 answer."""
+    client = client or get_http_client()
+    with metrics.span("openweather.weather"):
+        response = client.get(settings.OPENWEATHER_WEATHER_URL,
+                              params={"lat": lat, "lon": lon, "appid": api_key, "units": "metric"})
+        weather_data = response.json()
+    if response.status_code != 200:
+        raise WeatherServiceError(weather_data.get('message', 'Unknown error'))
+    return CurrentWeather(temp=weather_data['main']['temp'],
+                          humidity=weather_data['main']['humidity'],
+                          description=weather_data['weather'][0]['description'])
+
+
+def fetch_city_conditions(city_name, api_key, geocoder, climate_cache=None,
+                          start=DEFAULT_START, end=DEFAULT_END, timeout=30.0):
+    """Geocode ``city_name`` and fetch current weather and climate normals in parallel.
+
+    Geocoding errors propagate; errors (or a timeout) in either parallel fetch are
+    stored on the result so one slow or failing service does not hide the other.
+    """
+    location = geocoder.lookup(city_name)
+    result = CityConditions(location=location)
+    if location is None:
+        return result
+
+    climate_cache = climate_cache or get_climate_cache()
+    weather_future, normals_future = run_concurrently([
+        lambda: fetch_current_weather(location.lat, location.lon, api_key),
+        lambda: climate_cache.get(location.lat, location.lon, start, end),
+    ], timeout=timeout)
+
+    if not weather_future.done():
+        result.weather_error = TimeoutError(f"no answer from OpenWeather within {timeout:.0f}s")
+    elif weather_future.exception() is not None:
+        result.weather_error = weather_future.exception()
+    else:
+        result.weather = weather_future.result()
+
+    if not normals_future.done():
+        result.normals_error = TimeoutError(f"no answer from Meteostat within {timeout:.0f}s")
+    elif normals_future.exception() is not None:
+        result.normals_error = normals_future.exception()
+    else:
+        result.normals = normals_future.result()
+    return result
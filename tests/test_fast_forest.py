@@ -0,0 +1,58 @@
+"""FlatForest must predict exactly what the scikit-learn forest it was flattened from predicts."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from rootpredict import settings
+from rootpredict.fast_forest import ROW_BLOCK, FlatForest, max_parity_error, parity_sample
+
+joblib = pytest.importorskip("joblib")
+pytest.importorskip("sklearn")
+
+TOLERANCE = 1e-6
+
+
+@pytest.fixture(scope="module")
+def model():
+    return joblib.load(settings.MODEL_PATH)
+
+
+@pytest.fixture(scope="module")
+def features():
+    return list(joblib.load(settings.FEATURES_PATH))
+
+
+@pytest.fixture(scope="module")
+def flat(model):
+    return FlatForest.from_sklearn(model)
+
+
+def sklearn_predict(model, features):
+    return lambda X: model.predict(pd.DataFrame(X, columns=features))
+
+
+@pytest.mark.parametrize("n_rows", [1, 7, ROW_BLOCK, 3 * ROW_BLOCK + 5])
+def test_predict_matches_sklearn(model, features, flat, n_rows):
+    X = parity_sample(flat, n_rows=n_rows, seed=n_rows)
+    assert max_parity_error(flat, sklearn_predict(model, features), X) <= TOLERANCE
+
+
+def test_predict_per_tree_matches_each_estimator(model, features, flat):
+    X = parity_sample(flat, n_rows=2 * ROW_BLOCK + 17, seed=3)
+    per_tree = flat.predict_per_tree(X)
+    assert per_tree.shape == (len(model.estimators_), len(X))
+    for i, tree in enumerate(model.estimators_):
+        np.testing.assert_allclose(per_tree[i], tree.predict(X.astype(np.float32)), rtol=0, atol=TOLERANCE)
+    # The forest prediction is the mean over trees, block-wise or not
+    np.testing.assert_allclose(flat.predict(X), per_tree.mean(axis=0), rtol=0, atol=TOLERANCE)
+
+
+def test_single_row_vector(flat):
+    X = parity_sample(flat, n_rows=1, seed=5)
+    assert flat.predict(X[0]).shape == (1,)
+    assert flat.predict(X[0])[0] == pytest.approx(flat.predict(X)[0])
+
+
+def test_rejects_wrong_feature_count(flat):
+    with pytest.raises(ValueError, match="Expected"):
+        flat.predict(np.zeros((2, flat.n_features + 1)))
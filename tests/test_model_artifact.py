@@ -0,0 +1,65 @@
+"""Model artifacts round-trip a FlatForest, and damaged files are rejected."""
+import numpy as np
+import pytest
+
+from rootpredict import settings
+from rootpredict.fast_forest import ROW_BLOCK, FlatForest, parity_sample
+from rootpredict.model_artifact import MAGIC, load_artifact, read_header, write_artifact
+
+joblib = pytest.importorskip("joblib")
+pytest.importorskip("sklearn")
+
+
+@pytest.fixture(scope="module")
+def flat():
+    return FlatForest.from_sklearn(joblib.load(settings.MODEL_PATH))
+
+
+@pytest.fixture(scope="module")
+def features():
+    return list(joblib.load(settings.FEATURES_PATH))
+
+
+@pytest.fixture
+def artifact(tmp_path, flat, features):
+    path = tmp_path / "model.rpf"
+    write_artifact(str(path), flat, features, source_version="test-version")
+    return path
+
+
+def test_round_trip_predictions(artifact, flat):
+    loaded, _, header = load_artifact(str(artifact))
+    X = parity_sample(flat, n_rows=ROW_BLOCK + 100, seed=7)
+    np.testing.assert_array_equal(loaded.predict(X), flat.predict(X))
+    np.testing.assert_array_equal(loaded.predict_per_tree(X), flat.predict_per_tree(X))
+    assert (header["n_trees"], header["max_depth"]) == (flat.n_trees, flat.max_depth)
+    assert header["source_version"] == "test-version"
+
+
+def test_round_trip_keeps_feature_order(artifact, features):
+    _, loaded_features, header = load_artifact(str(artifact))
+    assert loaded_features == features
+    assert header["n_features"] == len(features)
+
+
+def test_truncated_prefix(tmp_path):
+    path = tmp_path / "short.rpf"
+    path.write_bytes(MAGIC[:4])
+    with pytest.raises(ValueError, match="truncated"):
+        read_header(str(path))
+
+
+def test_truncated_arrays(tmp_path, artifact):
+    path = tmp_path / "cut.rpf"
+    data = artifact.read_bytes()
+    path.write_bytes(data[:len(data) - 64])
+    with pytest.raises(ValueError, match="truncated"):
+        load_artifact(str(path))
+
+
+def test_bad_magic(tmp_path, artifact):
+    path = tmp_path / "bad.rpf"
+    data = artifact.read_bytes()
+    path.write_bytes(b"NOTMODEL" + data[len(MAGIC):])
+    with pytest.raises(ValueError, match="not a RootPredict model artifact"):
+        load_artifact(str(path))